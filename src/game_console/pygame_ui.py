@@ -1,30 +1,50 @@
+import logging
 import pygame
 import threading
 import time
+from collections import namedtuple
 from typing import Optional
 
+# Debug tracing goes through logging so the event loop never blocks on stdout;
+# enable it with logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
+
+# Board cells are stored as one byte each, row-major
+EMPTY_CELL = ord('.')
+X_CELL = ord('X')
+O_CELL = ord('O')
+EMPTY_BOARD = b'.' * 9
+
+# Immutable snapshot of everything the renderer reads from the game thread.
+# Writers publish a new instance with one attribute assignment (atomic under the GIL),
+# so the render path can read a consistent state without taking a lock.
+GameState = namedtuple('GameState', 'board player over status human_turn')
+
+# Posted by the game thread whenever it publishes new state
+UPDATE_EVENT = pygame.USEREVENT + 1
+
 
 class PygameGame:
     """Pygame-based UI for human vs AI Tic-Tac-Toe game.
 
     This class runs pygame in the main thread and coordinates with async game logic
-    running in a background thread via threading events.
+    running in a background thread: restart/shutdown commands go to the game's
+    asyncio control queue, and the human move handshake uses a threading event.
     """
 
     def __init__(self):
-        self.board = [['.' for _ in range(3)] for _ in range(3)]
-        self.current_player = None  # Who last played
+        # board: flat 3x3 bytes (index = row * 3 + col), player: who last played,
+        # human_turn: waiting for human input
+        self._state = GameState(board=EMPTY_BOARD, player=None, over=False, status="", human_turn=False)
         self.running = False
-        self.lock = threading.Lock()
-        self.game_over = False
-        self.game_status = ""
+        self.lock = threading.Lock()  # Guards read-modify-write of _state and the human move handshake
         self.screen = None
-        self.clock = None
-        self.human_turn = False  # Flag indicating if waiting for human input
         self.move_ready = threading.Event()
         self.human_move = None
-        self.shutdown_event = threading.Event()
-        self.restart_event = threading.Event()
+        self._last_drawn_key = None  # (board bytes, game_status) of the last update_board
+        self._control = None  # (loop, asyncio.Queue) receiving 'restart' / 'shutdown'
+        self._control_lock = threading.Lock()  # Pairs _control with shutdown_requested across threads
+        self.shutdown_requested = False
 
         # Layout constants
         self.SIDEBAR_WIDTH = 250
@@ -32,25 +52,64 @@ class PygameGame:
         self.GAME_WIDTH = 600
         self.GAME_START_Y = 100
 
-        # Button regions: (x, y, width, height)
-        self.restart_btn = (325, 720, 140, 50)
-        self.close_btn = (485, 720, 140, 50)
+        # Button regions (hit-tested with Rect.collidepoint)
+        self.restart_btn = pygame.Rect(325, 720, 140, 50)
+        self.close_btn = pygame.Rect(485, 720, 140, 50)
 
         # Model selection dropdown
         self.model_options = None  # List of available models
-        self.selected_model_index = 0  # Currently selected model index
+        # (index, name) of the selected model, republished as a whole so readers
+        # never need the lock; name falls back to "gemini" until options are set
+        self._selected = (0, "gemini")
         self.dropdown_open = False  # Is dropdown menu expanded
-        self.dropdown_rect = (20, 20, 200, 40)  # x, y, width, height
+        self.dropdown_rect = pygame.Rect(20, 20, 200, 40)
         self.dropdown_items_rect = []  # Calculated dynamically when opened
-        self.model_lock = threading.Lock()  # Lock for model selection state
+        self.model_lock = threading.Lock()  # Guards compound updates to model selection state
 
         # Radio button for model selection
-        self.radio_buttons = []  # List of (label, rect) tuples
+        # Radio buttons sit on a fixed grid, so hit-testing is arithmetic
         self.radio_button_start_y = 80  # First radio button y position
         self.radio_button_spacing = 40  # Space between radio buttons
-
-        # Score tracking
-        self.score = {'AI': 0, 'Human': 0}
+        self.radio_button_size = (200, 30)  # Clickable region of each row, starting at x=20
+
+        # Score tracking: (AI, Human), replaced atomically on every change
+        self._score = (0, 0)
+
+        # Fonts and pre-rendered text surfaces (built in start())
+        self._font_glyph = None
+        self._font_status = None
+        self._font_btn = None
+        self._font_header = None
+        self._font_label = None
+        self._font_score = None
+        self._glyph_x = None
+        self._glyph_o = None
+        self._glyphs = {}  # cell byte -> (glyph Surface, per-cell blit topleft)
+        self._status_cache = {}  # status text -> rendered Surface
+        self._restart_surface = None
+        self._close_surface = None
+
+        # Immutable pixels (grid, sidebar chrome), rebuilt only when the layout changes
+        self._background = None
+        self._bg_dirty = True
+
+        # Rendered sidebar, reused until its inputs change
+        self._sidebar_cache = None
+        self._sidebar_key = None
+        self._ai_score_cache = (-1, None)  # (score, rendered Surface)
+        self._human_score_cache = (-1, None)
+
+        # Dirty-rectangle tracking: only regions whose inputs changed are presented
+        self._last_frame = None  # (board, game_over, status_text, sidebar_state) last presented
+        self._dirty_rects = []
+        self._status_area = pygame.Rect(self.GAME_START_X, 0, self.GAME_WIDTH, self.GAME_START_Y)
+        self._button_area = pygame.Rect(self.GAME_START_X, self.GAME_START_Y + 600, self.GAME_WIDTH, 100)
+        self._sidebar_area = pygame.Rect(0, 0, self.SIDEBAR_WIDTH, 800)
+
+        # Per-cell geometry, indexed like the flat board (row * 3 + col)
+        self._cell_rects = tuple(pygame.Rect(self.GAME_START_X + (i % 3) * 200, self.GAME_START_Y + (i // 3) * 200, 200, 200)
+                                 for i in range(9))
+        self._cell_centers = tuple(rect.center for rect in self._cell_rects)
 
     def start(self):
         """Initialize pygame - this must be called from main thread."""
@@ -58,34 +117,54 @@ class PygameGame:
         pygame.font.init()
         self.screen = pygame.display.set_mode((850, 800))  # 250 sidebar + 600 game
         pygame.display.set_caption("Tic-Tac-Toe: You (X) vs AI (O)")
-        self.clock = pygame.time.Clock()
+        # Only queue the events the loop acts on; motion, keyboard, joystick and
+        # window-management events are dropped inside SDL
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.VIDEOEXPOSE, UPDATE_EVENT])
         self.running = True
         self.model_selection_enabled = True  # Start enabled
 
+        # Font objects are FreeType handles - create them once, not per frame
+        self._font_glyph = pygame.font.Font(None, 120)
+        self._font_status = pygame.font.Font(None, 48)
+        self._font_btn = pygame.font.Font(None, 36)
+        self._font_header = pygame.font.Font(None, 36)
+        self._font_label = pygame.font.Font(None, 28)
+        self._font_score = pygame.font.Font(None, 32)
+
+        # Glyphs and status strings never change, so render them once. Cached
+        # surfaces are converted to the display's pixel format (set_mode() above
+        # must run first) so blits skip per-pixel format conversion.
+        self._glyph_x = self._font_glyph.render('X', True, (200, 0, 0)).convert_alpha()
+        self._glyph_o = self._font_glyph.render('O', True, (0, 0, 200)).convert_alpha()
+        self._glyphs = {X_CELL: (self._glyph_x, self._glyph_topleft(self._glyph_x)),
+                        O_CELL: (self._glyph_o, self._glyph_topleft(self._glyph_o))}
+        self._status_cache = {}
+        self._build_button_surfaces()
+
     def set_model_options(self, models: list[str], default: str = None):
         """Set available models for dropdown selection."""
         with self.model_lock:
             self.model_options = models
-            if default and default in models:
-                self.selected_model_index = models.index(default)
-            else:
-                self.selected_model_index = 0
+            index = models.index(default) if default and default in models else 0
+            self._selected = (index, models[index] if models else "gemini")
+        # Status strings embed model names (e.g. "WINNER gemini")
+        self._status_cache.clear()
+        self._bg_dirty = True  # Separator and score label move with the option count
 
     def get_selected_model(self) -> str:
         """Get the currently selected model name."""
-        with self.model_lock:
-            if self.model_options:
-                return self.model_options[self.selected_model_index]
-            return "gemini"  # Fallback default
+        return self._selected[1]
 
     def set_model_selection_enabled(self, enabled: bool):
         """Enable or disable model selection dropdown."""
-        print(f"[DEBUG] set_model_selection_enabled({enabled}) called")
+        log.debug("set_model_selection_enabled(%s) called", enabled)
         with self.model_lock:
             self.model_selection_enabled = enabled
             if not enabled:
                 self.dropdown_open = False  # Close dropdown when disabled
-        print(f"[DEBUG] model_selection_enabled is now: {self.model_selection_enabled}")
+        self._request_redraw()
+        log.debug("model_selection_enabled is now: %s", self.model_selection_enabled)
 
     def update_score(self, winner: str):
         """Update score when a game completes.
@@ -94,232 +173,368 @@ class PygameGame:
             winner: 'AI', 'Human', or 'DRAW'
         """
         with self.model_lock:
+            ai, human = self._score
             if winner == 'AI':
-                self.score['AI'] += 1
+                self._score = (ai + 1, human)
             elif winner == 'Human':
-                self.score['Human'] += 1
+                self._score = (ai, human + 1)
             # DRAW doesn't increment either score
+        self._request_redraw()
 
     def get_score(self) -> dict[str, int]:
         """Get current score."""
-        with self.model_lock:
-            return self.score.copy()
+        ai, human = self._score
+        return {'AI': ai, 'Human': human}
 
     def reset_score(self):
         """Reset score to zero."""
-        with self.model_lock:
-            self.score = {'AI': 0, 'Human': 0}
+        self._score = (0, 0)
 
     def run_event_loop(self, stop_event=None):
-        """Run the pygame event loop - this blocks and should be in main thread."""
-        font = pygame.font.Font(None, 120)
-        status_font = pygame.font.Font(None, 48)
+        """Run the pygame event loop - this blocks and should be in main thread.
 
+        Each iteration is split into three phases: drain input events, snapshot the
+        state published by the game thread, and render only if something changed.
+        """
+        frame_interval = 1 / 30
+        heartbeat = 0.25  # Re-check state at least this often even without events
+        last_draw = 0.0
         while self.running:
-            # Process pygame events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    self.shutdown_event.set()
-                    return
+            # Phase 1: input. Sleep until an event arrives (the game thread posts
+            # UPDATE_EVENT after mutating state) or the heartbeat elapses
+            events = [pygame.event.wait(int(heartbeat * 1000))] + pygame.event.get()
 
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    x, y = pygame.mouse.get_pos()
-                    click_handled = False
-
-                    # Check radio button clicks first (if enabled)
-                    if self.model_selection_enabled and self.model_options is not None:
-                        for i, (model_name, rect) in enumerate(self.radio_buttons):
-                            if (rect[0] <= x <= rect[0] + rect[2] and
-                                rect[1] <= y <= rect[1] + rect[3]):
-                                with self.model_lock:
-                                    self.selected_model_index = i
-                                print(f"[DEBUG] Radio button clicked: {model_name} (index {i})")
-                                click_handled = True
-                                break  # Don't check other radio buttons
-
-                    # Only check buttons if radio button wasn't clicked
-                    if not click_handled and self.game_over:
-                        # Check button clicks
-                        # Restart button
-                        if (self.restart_btn[0] <= x <= self.restart_btn[0] + self.restart_btn[2] and
-                            self.restart_btn[1] <= y <= self.restart_btn[1] + self.restart_btn[3]):
-                            print(f"[DEBUG] Restart button clicked! Selected model: {self.get_selected_model()}")
-                            self.restart_event.set()
-                        # Close button
-                        elif (self.close_btn[0] <= x <= self.close_btn[0] + self.close_btn[2] and
-                              self.close_btn[1] <= y <= self.close_btn[1] + self.close_btn[3]):
-                            self.restart_event.clear()  # Clear restart to avoid confusion
-                            self.running = False
-                            self.shutdown_event.set()
-                            return
-                    else:
-                        # Game in progress - check for board clicks
-                        col = (x - self.GAME_START_X) // 200
-                        row = (y - self.GAME_START_Y) // 200
-
-                        if 0 <= row < 3 and 0 <= col < 3:
-                            # Quick check without lock - is cell empty and is it human's turn?
-                            with self.lock:
-                                cell_empty = self.board[row][col] == '.'
-                                is_human_turn = self.human_turn
-
-                            if cell_empty and is_human_turn:
-                                # Valid move - record it
-                                with self.lock:
-                                    self.board[row][col] = 'X'
-                                    self.human_move = (row, col)
-                                    self.human_turn = False
-                                self.move_ready.set()
-
-            # Draw everything
-            self.screen.fill((240, 240, 240))
-
-            # Draw Admin Sidebar
-            self._draw_sidebar()
-
-            # Draw grid lines (with offset for sidebar)
-            for i in range(1, 3):
-                x_pos = self.GAME_START_X + i * 200
-                pygame.draw.line(self.screen, (0, 0, 0), (x_pos, self.GAME_START_Y), (x_pos, self.GAME_START_Y + 600), 3)
-                y_pos = self.GAME_START_Y + i * 200
-                pygame.draw.line(self.screen, (0, 0, 0), (self.GAME_START_X, y_pos), (self.GAME_START_X + self.GAME_WIDTH, y_pos), 3)
-
-            # Draw symbols
-            with self.lock:
-                board_copy = [row[:] for row in self.board]
-
-            for row in range(3):
-                for col in range(3):
-                    if board_copy[row][col] != '.':
-                        color = (200, 0, 0) if board_copy[row][col] == 'X' else (0, 0, 200)
-                        text = font.render(board_copy[row][col], True, color)
-                        rect = text.get_rect(center=(self.GAME_START_X + col * 200 + 100, self.GAME_START_Y + row * 200 + 100))
-                        self.screen.blit(text, rect)
-
-            # Draw status
-            with self.lock:
-                current_player = self.current_player
-                game_over = self.game_over
-                game_status = self.game_status
-                human_turn = self.human_turn
-
-            if game_over:
-                # Draw status/result text first
-                status_text = game_status
-                status_surf = status_font.render(status_text, True, (0, 0, 0))
-                self.screen.blit(status_surf, (self.GAME_START_X + 300 - status_surf.get_width() // 2, 30))
-
-                # Draw buttons on top of everything
-                btn_font = pygame.font.Font(None, 36)
-
-                # Restart button (green)
-                pygame.draw.rect(self.screen, (50, 150, 50), self.restart_btn, border_radius=10)
-                restart_text = btn_font.render("Restart", True, (255, 255, 255))
-                restart_rect = restart_text.get_rect(center=(
-                    self.restart_btn[0] + self.restart_btn[2] // 2,
-                    self.restart_btn[1] + self.restart_btn[3] // 2
-                ))
-                self.screen.blit(restart_text, restart_rect)
-
-                # Close button (red)
-                pygame.draw.rect(self.screen, (200, 50, 50), self.close_btn, border_radius=10)
-                close_text = btn_font.render("Close", True, (255, 255, 255))
-                close_rect = close_text.get_rect(center=(
-                    self.close_btn[0] + self.close_btn[2] // 2,
-                    self.close_btn[1] + self.close_btn[3] // 2
-                ))
-                self.screen.blit(close_text, close_rect)
-            elif human_turn:
-                status_text = "Your turn (X) - Click a cell"
-            elif current_player == 'O':
-                status_text = "Your turn (X) - Click a cell"
-            else:
-                status_text = "AI thinking..."
-
-            if not game_over:
-                status_surf = status_font.render(status_text, True, (0, 0, 0))
-                self.screen.blit(status_surf, (self.GAME_START_X + 300 - status_surf.get_width() // 2, 50))
+            # Coalesce clicks: only the last click queued this frame is honored, so a
+            # burst delivered after an OS pause cannot fire several moves at once
+            clicks = [e for e in events if e.type == pygame.MOUSEBUTTONDOWN]
+            last_click = clicks[-1] if clicks else None
+            needs_draw = last_click is not None
 
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.request_shutdown()
+                    return
+                if event.type == pygame.VIDEOEXPOSE:
+                    self._last_frame = None  # Window contents lost - flip everything
+                    needs_draw = True
+                elif event.type == UPDATE_EVENT:
+                    needs_draw = True
+
+            if last_click is not None and not self._handle_click(*last_click.pos):
+                return
+
+            if not needs_draw and time.monotonic() - last_draw < heartbeat:
+                continue
+
+            # Phase 2: snapshot the state this frame depends on - one read, no locking
+            frame = self._snapshot_frame()
+            if frame == self._last_frame and not self._bg_dirty:
+                # Nothing changed - skip drawing and presenting entirely
+                continue
+
+            # Phase 3: render
+            self._draw_frame(frame)
+
+            # Cap redraws at 30 FPS - only throttle after a frame was actually drawn;
+            # idle iterations go straight back to pygame.event.wait()
+            elapsed = time.monotonic() - last_draw
+            if elapsed < frame_interval:
+                pygame.time.wait(int((frame_interval - elapsed) * 1000))
+            last_draw = time.monotonic()
+
+    def _snapshot_frame(self):
+        """Return (board, game_over, status_text, sidebar_state) for the current state."""
+        st = self._state
+        sidebar_state = (tuple(self.model_options or ()), self._selected[0],
+                         self.model_selection_enabled, *self._score)
+
+        if st.over:
+            status_text = st.status
+        elif st.human_turn:
+            status_text = "Your turn (X) - Click a cell"
+        elif st.player == 'O':
+            status_text = "Your turn (X) - Click a cell"
+        else:
+            status_text = "AI thinking..."
+
+        return st.board, st.over, status_text, sidebar_state
+
+    def _draw_frame(self, frame):
+        """Draw a frame snapshot and present the regions that changed since the last one."""
+        board, game_over, status_text, sidebar_state = frame
+
+        full_redraw = self._last_frame is None or self._bg_dirty
+        if not full_redraw:
+            self._dirty_rects = self._dirty_regions(self._last_frame, frame)
+
+        # Draw everything
+        if self._bg_dirty:
+            self._rebuild_background()
+        self.screen.blit(self._background, (0, 0))
+
+        # Draw Admin Sidebar (mutable parts only)
+        self._draw_sidebar(sidebar_state)
+
+        # Draw symbols
+        for i, cell in enumerate(board):
+            if cell != EMPTY_CELL:
+                surf, topleft = self._glyphs[cell]
+                self.screen.blit(surf, topleft[i])
+
+        # Draw status
+        if game_over:
+            # Draw status/result text first
+            status_surf = self._render_status(status_text)
+            self.screen.blit(status_surf, (self.GAME_START_X + 300 - status_surf.get_width() // 2, 30))
+
+            # Draw buttons on top of everything
+            self.screen.blit(self._restart_surface, self.restart_btn)
+            self.screen.blit(self._close_surface, self.close_btn)
+        else:
+            status_surf = self._render_status(status_text)
+            self.screen.blit(status_surf, (self.GAME_START_X + 300 - status_surf.get_width() // 2, 50))
+
+        # Present: full flip on the first frame and after a background rebuild,
+        # otherwise only the regions that changed
+        if full_redraw:
             pygame.display.flip()
-            self.clock.tick(30)
-
-    def _draw_sidebar(self):
-        """Draw the Admin sidebar with model selection and score."""
-        # Draw sidebar background
+        else:
+            pygame.display.update(self._dirty_rects)
+        self._last_frame = frame
+
+    def _handle_click(self, x: int, y: int) -> bool:
+        """Handle a mouse click at (x, y). Returns False when the window should close."""
+        click_handled = False
+
+        # Check radio button clicks first (if enabled)
+        if self.model_selection_enabled and self.model_options is not None:
+            i = self._radio_index_at(x, y)
+            if i is not None:
+                with self.model_lock:
+                    self._selected = (i, self.model_options[i])
+                log.debug("Radio button clicked: %s (index %d)", self.model_options[i], i)
+                click_handled = True
+
+        # Only check buttons if radio button wasn't clicked
+        if not click_handled and self._state.over:
+            # Check button clicks
+            # Restart button
+            if self.restart_btn.collidepoint(x, y):
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Restart button clicked! Selected model: %s", self.get_selected_model())
+                self._send_command('restart')
+            # Close button
+            elif self.close_btn.collidepoint(x, y):
+                self.request_shutdown()
+                return False
+        else:
+            # Game in progress - check for board clicks
+            col = (x - self.GAME_START_X) // 200
+            row = (y - self.GAME_START_Y) // 200
+
+            if 0 <= row < 3 and 0 <= col < 3:
+                # Quick check without lock - is cell empty and is it human's turn?
+                idx = row * 3 + col
+                st = self._state
+                if st.board[idx] == EMPTY_CELL and st.human_turn:
+                    # Valid move - record it (re-check under the lock)
+                    with self.lock:
+                        st = self._state
+                        if st.board[idx] == EMPTY_CELL and st.human_turn:
+                            board = bytearray(st.board)
+                            board[idx] = X_CELL
+                            self.human_move = (row, col)
+                            self._state = st._replace(board=bytes(board), human_turn=False)
+                            self.move_ready.set()
+        return True
+
+    def _dirty_regions(self, prev, frame) -> list[pygame.Rect]:
+        """Return the screen regions that differ between two frame snapshots."""
+        prev_board, prev_over, prev_status, prev_sidebar = prev
+        board, game_over, status_text, sidebar_state = frame
+
+        rects = []
+        for i, cell_rect in enumerate(self._cell_rects):
+            if prev_board[i] != board[i]:
+                rects.append(cell_rect)
+        if prev_status != status_text or prev_over != game_over:
+            rects.append(self._status_area)
+        if prev_over != game_over:
+            rects.append(self._button_area)
+        if prev_sidebar != sidebar_state:
+            rects.append(self._sidebar_area)
+        return rects
+
+    def _glyph_topleft(self, glyph: pygame.Surface) -> tuple[tuple[int, int], ...]:
+        """Blit positions that center a fixed-size glyph in each of the nine cells."""
+        return tuple(glyph.get_rect(center=center).topleft for center in self._cell_centers)
+
+    def _build_button_surfaces(self):
+        """Pre-render the Restart/Close buttons (rounded rect + centered label)."""
+        self._restart_surface = self._render_button(self.restart_btn, (50, 150, 50), "Restart")
+        self._close_surface = self._render_button(self.close_btn, (200, 50, 50), "Close")
+
+    def _render_button(self, btn: pygame.Rect, color, label) -> pygame.Surface:
+        """Render one button the size of btn into its own surface."""
+        surf = pygame.Surface(btn.size, pygame.SRCALPHA)
+        local_rect = surf.get_rect()
+        pygame.draw.rect(surf, color, local_rect, border_radius=10)
+        text = self._font_btn.render(label, True, (255, 255, 255))
+        surf.blit(text, text.get_rect(center=local_rect.center))
+        return surf.convert_alpha()
+
+    def set_control_queue(self, loop, queue):
+        """
+        Route restart/shutdown commands to `queue`, which is consumed on `loop`;
+        (None, None) detaches it. Call from the thread running `loop`.
+        """
+        with self._control_lock:
+            self._control = (loop, queue) if loop is not None else None
+            pending = self.shutdown_requested
+        if pending and queue is not None:
+            queue.put_nowait('shutdown')  # Window closed before the game loop attached
+
+    def _send_command(self, command: str):
+        """Hand a command to the game loop - safe to call from any thread."""
+        with self._control_lock:
+            control = self._control
+        if control is None:
+            return
+        loop, queue = control
+        if loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, command)
+        except RuntimeError:
+            pass  # Loop closed between the check and the call
+
+    def request_shutdown(self):
+        """Stop the UI loop and tell the game loop to finish."""
+        with self._control_lock:
+            self.shutdown_requested = True
+        self.running = False
+        self._send_command('shutdown')
+        self.move_ready.set()  # Release a pending wait_for_human_move (returns None)
+
+    def _request_redraw(self):
+        """Ask the event loop to redraw - safe to call from any thread."""
+        if self.running:
+            # Wakes a blocked pygame.event.wait() immediately
+            pygame.event.post(pygame.event.Event(UPDATE_EVENT))
+
+    def _render_status(self, text: str) -> pygame.Surface:
+        """Return the rendered status text, memoized by string."""
+        surf = self._status_cache.get(text)
+        if surf is None:
+            surf = self._font_status.render(text, True, (0, 0, 0)).convert_alpha()
+            self._status_cache[text] = surf
+        return surf
+
+    def _radio_index_at(self, x: int, y: int) -> Optional[int]:
+        """Return the index of the radio button under (x, y), or None."""
+        idx = (y - self.radio_button_start_y) // self.radio_button_spacing
+        if not 0 <= idx < len(self.model_options):
+            return None
+        row_rect = pygame.Rect((20, self.radio_button_start_y + idx * self.radio_button_spacing), self.radio_button_size)
+        return idx if row_rect.collidepoint(x, y) else None
+
+    def _rebuild_background(self):
+        """Compose the static background: fill, grid lines and sidebar chrome."""
+        background = pygame.Surface(self.screen.get_size()).convert()
+        background.fill((240, 240, 240))
+
+        # Sidebar background
         sidebar_rect = (0, 0, self.SIDEBAR_WIDTH, 800)
-        pygame.draw.rect(self.screen, (230, 230, 240), sidebar_rect)
-        pygame.draw.line(self.screen, (100, 100, 100), (self.SIDEBAR_WIDTH, 0), (self.SIDEBAR_WIDTH, 800), 2)
+        pygame.draw.rect(background, (230, 230, 240), sidebar_rect)
+        pygame.draw.line(background, (100, 100, 100), (self.SIDEBAR_WIDTH, 0), (self.SIDEBAR_WIDTH, 800), 2)
 
-        # Draw "Admin" header
-        header_font = pygame.font.Font(None, 36)
-        header_text = header_font.render("Admin", True, (0, 0, 100))
-        self.screen.blit(header_text, (20, 20))
+        # "Admin" header
+        header_text = self._font_header.render("Admin", True, (0, 0, 100))
+        background.blit(header_text, (20, 20))
 
-        # Draw "Select AI Model:" label
-        label_font = pygame.font.Font(None, 28)
-        model_label = label_font.render("Select AI Model:", True, (0, 0, 0))
-        self.screen.blit(model_label, (20, 60))
+        # "Select AI Model:" label
+        model_label = self._font_label.render("Select AI Model:", True, (0, 0, 0))
+        background.blit(model_label, (20, 60))
 
-        # Draw radio buttons for each model
         with self.model_lock:
-            enabled = self.model_selection_enabled
-            selected_idx = self.selected_model_index
-            if self.model_options:
-                options = self.model_options[:]
-            else:
-                options = []
-
-        self.radio_buttons = []
-        for i, model_name in enumerate(options):
-            y_pos = self.radio_button_start_y + i * self.radio_button_spacing
-
-            # Radio button circle
-            radio_center = (40, y_pos + 10)
-            radio_radius = 10
-            pygame.draw.circle(self.screen, (255, 255, 255), radio_center, radio_radius)
-            pygame.draw.circle(self.screen, (0, 0, 0), radio_center, radio_radius, 2)
-
-            # Fill if selected
-            if i == selected_idx:
-                pygame.draw.circle(self.screen, (0, 0, 200), radio_center, radio_radius - 4)
-
-            # Store radio button rect for click detection
-            radio_rect = (20, y_pos, 200, 30)
-            self.radio_buttons.append((model_name, radio_rect))
-
-            # Draw model name
-            model_text = label_font.render(model_name, True, (0, 0, 0) if enabled else (150, 150, 150))
-            self.screen.blit(model_text, (60, y_pos))
-
-        # Draw separator line
-        separator_y = self.radio_button_start_y + len(options) * self.radio_button_spacing + 20
-        pygame.draw.line(self.screen, (150, 150, 150), (20, separator_y), (230, separator_y), 2)
-
-        # Draw "Score:" label
-        score_label_y = separator_y + 20
-        score_label = label_font.render("Score:", True, (0, 0, 100))
-        self.screen.blit(score_label, (20, score_label_y))
-
-        # Draw scores
-        with self.model_lock:
-            ai_score = self.score['AI']
-            human_score = self.score['Human']
+            option_count = len(self.model_options) if self.model_options else 0
+
+        # Empty radio button circles
+        for i in range(option_count):
+            radio_center = (40, self.radio_button_start_y + i * self.radio_button_spacing + 10)
+            pygame.draw.circle(background, (255, 255, 255), radio_center, 10)
+            pygame.draw.circle(background, (0, 0, 0), radio_center, 10, 2)
+
+        # Separator line
+        separator_y = self.radio_button_start_y + option_count * self.radio_button_spacing + 20
+        pygame.draw.line(background, (150, 150, 150), (20, separator_y), (230, separator_y), 2)
+
+        # "Score:" label
+        score_label = self._font_label.render("Score:", True, (0, 0, 100))
+        background.blit(score_label, (20, separator_y + 20))
+
+        # Grid lines (with offset for sidebar)
+        for i in range(1, 3):
+            x_pos = self.GAME_START_X + i * 200
+            pygame.draw.line(background, (0, 0, 0), (x_pos, self.GAME_START_Y), (x_pos, self.GAME_START_Y + 600), 3)
+            y_pos = self.GAME_START_Y + i * 200
+            pygame.draw.line(background, (0, 0, 0), (self.GAME_START_X, y_pos), (self.GAME_START_X + self.GAME_WIDTH, y_pos), 3)
+
+        self._background = background
+        self._bg_dirty = False
+        self._sidebar_key = None  # Cached sidebar was drawn over the old background
 
-        score_font = pygame.font.Font(None, 32)
-        ai_text = score_font.render(f"AI: {ai_score}", True, (200, 0, 0))
-        human_text = score_font.render(f"Human: {human_score}", True, (0, 0, 200))
-        self.screen.blit(ai_text, (30, score_label_y + 40))
-        self.screen.blit(human_text, (30, score_label_y + 80))
+    def _draw_sidebar(self, key):
+        """Draw the mutable sidebar parts: selected radio, model labels and scores.
 
-    def wait_for_human_move(self) -> tuple[int, int]:
-        """Block until human makes a move - called from async thread."""
+        Args:
+            key: (model options, selected index, enabled, AI score, Human score); the
+                rendered sidebar is cached and only redrawn when this changes.
+        """
+        if key != self._sidebar_key:
+            options, selected_idx, enabled, ai_score, human_score = key
+            sidebar = self._sidebar_cache
+            if sidebar is None:
+                sidebar = pygame.Surface(self._sidebar_area.size).convert()
+                self._sidebar_cache = sidebar
+            sidebar.blit(self._background, (0, 0), self._sidebar_area)
+
+            for i, model_name in enumerate(options):
+                y_pos = self.radio_button_start_y + i * self.radio_button_spacing
+
+                # Fill if selected
+                if i == selected_idx:
+                    pygame.draw.circle(sidebar, (0, 0, 200), (40, y_pos + 10), 6)
+
+                # Draw model name
+                model_text = self._font_label.render(model_name, True, (0, 0, 0) if enabled else (150, 150, 150))
+                sidebar.blit(model_text, (60, y_pos))
+
+            # Draw scores
+            score_label_y = self.radio_button_start_y + len(options) * self.radio_button_spacing + 40
+            if self._ai_score_cache[0] != ai_score:
+                self._ai_score_cache = (ai_score, self._font_score.render(f"AI: {ai_score}", True, (200, 0, 0)).convert_alpha())
+            if self._human_score_cache[0] != human_score:
+                self._human_score_cache = (human_score, self._font_score.render(f"Human: {human_score}", True, (0, 0, 200)).convert_alpha())
+            sidebar.blit(self._ai_score_cache[1], (30, score_label_y + 40))
+            sidebar.blit(self._human_score_cache[1], (30, score_label_y + 80))
+            self._sidebar_key = key
+
+        self.screen.blit(self._sidebar_cache, self._sidebar_area)
+
+    def wait_for_human_move(self) -> tuple[int, int] | None:
+        """Block until human makes a move - called from async thread. None once shutdown is requested."""
         with self.lock:
-            self.human_turn = True
-            self.move_ready.clear()
+            with self._control_lock:
+                # Checked with the clear: a shutdown that already set move_ready must not be undone
+                if self.shutdown_requested:
+                    return None
+                self.move_ready.clear()
+            self._state = self._state._replace(human_turn=True)
             self.human_move = None
 
         # Wait for the move (release lock while waiting)
+        self._request_redraw()
         self.move_ready.wait()
 
         with self.lock:
@@ -329,32 +544,42 @@ class PygameGame:
         return move
 
     def update_board(self, board, last_player, game_status=None):
-        """Update the display with current board state - called from async thread."""
-        with self.lock:
-            self.board = [row[:] for row in board]
-            self.current_player = last_player
-            if game_status is not None:
-                self.game_over = True
-                self.game_status = game_status
+        """Update the display with current board state - called from async thread.
+
+        Args:
+            board: flat 9-byte row-major board (bytes/bytearray), or a 3x3 list of
+                single-character strings
+            last_player: symbol of the player who just moved
+            game_status: final result text; marks the game as over when given
+        """
+        if isinstance(board, (bytes, bytearray)):
+            cells = bytes(board)
+        else:
+            cells = ''.join(map(''.join, board)).encode('ascii')
+        key = (cells, game_status)
+        if key == self._last_drawn_key:
+            return  # Nothing changed since the last publish
+        self._last_drawn_key = key
+        # Single writer: the game thread only calls this when the human is not
+        # being waited on, so the new snapshot is published without the lock
+        self._state = GameState(board=cells, player=last_player, over=game_status is not None,
+                                status=game_status or "", human_turn=False)
+        self._request_redraw()
 
     def reset_game(self):
         """Reset game state for a new game."""
-        print(f"[DEBUG] reset_game() called")
+        log.debug("reset_game() called")
         with self.lock:
-            self.board = [['.' for _ in range(3)] for _ in range(3)]
-            self.current_player = None
-            self.game_over = False
-            self.game_status = ""
-            self.human_turn = False
+            self._state = GameState(board=EMPTY_BOARD, player=None, over=False, status="", human_turn=False)
             self.human_move = None
-            self.restart_event.clear()
+        self._last_drawn_key = None
+        self._request_redraw()
 
         # Re-enable model selection on restart
-        print(f"[DEBUG] Model selection re-enabled")
+        log.debug("Model selection re-enabled")
         self.set_model_selection_enabled(True)
 
     def shutdown(self):
         """Clean shutdown."""
-        self.running = False
-        self.shutdown_event.set()
+        self.request_shutdown()
         pygame.quit()
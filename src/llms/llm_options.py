@@ -1,14 +1,26 @@
+import importlib.util
+from functools import lru_cache
+
+import httpx
 from langchain_ollama import ChatOllama
 from sarvam import SarvamChat
 
 
+# Keep-alive pool for each cached model's HTTP client, so turns reuse warm connections
+# instead of paying a TCP/TLS handshake; HTTP/2 only when the optional h2 package is installed
+_POOL_LIMITS = httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60)
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+
 def get_llm_options():
     return ["zai", "nvidia", "mistral", "openai", "gemini", 'sarvam', 'minimax']
 
 
+@lru_cache(maxsize=None)
 def get_llm(name: str | None = None):
     """
     Returns specific ollama or sarvam chat model, default = deepseek
+    Instances are cached per name so their HTTP clients are reused across games.
     :param name: name of the model
     :param name:
     :return:
@@ -57,6 +69,21 @@ def _get_chat_ollama_instance(model: str):
         base_url="https://ollama.com",  # Cloud endpoint
         client_kwargs={
             "headers": {"Authorization": "Bearer " + os.getenv("OLLAMA_API_KEY")},
-            "timeout": 60.0  # Timeout in seconds
+            "timeout": 60.0,  # Timeout in seconds
+            "limits": _POOL_LIMITS,
+            "http2": _HTTP2,
         }
     )
+
+
+async def aclose_llms(*llms) -> None:
+    """
+    Closes the pooled async HTTP clients of the given models at the end of a run
+    and empties the get_llm cache so a later call builds fresh clients.
+    :param llms: models returned by get_llm
+    """
+    for llm in {id(llm): llm for llm in llms}.values():
+        client = getattr(llm, '_async_client', None)
+        if client is not None:
+            await client.close()
+    get_llm.cache_clear()
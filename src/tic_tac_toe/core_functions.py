@@ -1,21 +1,70 @@
+import re
+
 from langchain_core.messages import AIMessage
 
+_COORD_RE = re.compile(r"(-?\d+)\s*[, ]\s*(-?\d+)")
+
+# Bitboards: bit (row * 3 + col) is set when that cell holds the player's symbol
+WIN_MASKS = (0o007, 0o070, 0o700,  # rows
+             0o111, 0o222, 0o444,  # columns
+             0o421, 0o124)  # diagonals
+FULL_BOARD = 0o777
+
 
 def parse_coord(s: str) -> tuple[int, int] | None:
-    import re
-    m = re.search(r"(-?\d+)\s*[, ]\s*(-?\d+)", s)
+    # Fast path: the model is told to answer exactly "row,col"
+    parts = s.strip().split(',', 1)
+    try:
+        return int(parts[0]), int(parts[1].split()[0])
+    except (ValueError, IndexError):
+        pass
+    # Fall back to scanning free-form output
+    m = _COORD_RE.search(s)
     if not m:
         return None
     return int(m.group(1)), int(m.group(2))
 
 
+def render_board(board: bytes | bytearray) -> str:
+    """Render a flat 9-byte board as three lines of three cells, row 0 first."""
+    b = board.decode('ascii')
+    return f"{b[0:3]}\n{b[3:6]}\n{b[6:9]}"
+
+
 def valid_move(board, i, j):
     return 0 <= i < 3 and 0 <= j < 3 and board[i][j] == '.'
 
 
+def board_to_bits(board) -> tuple[int, int]:
+    """Convert a 3x3 list board into (x_bits, o_bits) bitboards."""
+    x_bits = o_bits = 0
+    for r, row in enumerate(board):
+        for c, cell in enumerate(row):
+            if cell == 'X':
+                x_bits |= 1 << (r * 3 + c)
+            elif cell == 'O':
+                o_bits |= 1 << (r * 3 + c)
+    return x_bits, o_bits
+
+
+def valid_move_bits(occupied: int, i, j):
+    """Bitboard version of valid_move; occupied is x_bits | o_bits."""
+    return 0 <= i < 3 and 0 <= j < 3 and not (occupied >> (i * 3 + j)) & 1
+
+
+def check_winner_bits(x_bits: int, o_bits: int):
+    """Bitboard version of check_winner: 'X', 'O', 'DRAW' or None."""
+    for m in WIN_MASKS:
+        if x_bits & m == m:
+            return 'X'
+        if o_bits & m == m:
+            return 'O'
+    if x_bits | o_bits == FULL_BOARD:
+        return 'DRAW'
+    return None
+
+
 def check_winner(b):
-    lines = ([(r, c) for c in range(3)] for r in range(3))  # rows generator
-    wins = []
     for r in range(3):
         if b[r][0] == b[r][1] == b[r][2] != '.':
             return b[r][0]
@@ -26,10 +75,64 @@ def check_winner(b):
         return b[0][0]
     if b[0][2] == b[1][1] == b[2][0] != '.':
         return b[0][2]
-    if all(cell != '.' for row in b for cell in row):
+    if not any('.' in row for row in b):
         return 'DRAW'
     return None
 
 
-def get_token_used(response: AIMessage):
-    return response.usage_metadata['total_tokens']
+def get_token_used(response: AIMessage) -> int:
+    # Some models return no usage metadata at all
+    return (getattr(response, 'usage_metadata', None) or {}).get('total_tokens', 0)
+
+
+def reported_tokens(response: AIMessage) -> int | None:
+    # None when no usage was reported: some models never send it, and a streamed
+    # reply cut off by astream_move loses the final chunk that carries it
+    if not getattr(response, 'usage_metadata', None):
+        return None
+    return get_token_used(response)
+
+
+def add_tokens(total: int, unreported: int, tokens: int | None) -> tuple[int, int]:
+    """Add one reply's reported_tokens to (total, count of replies with no usage)."""
+    if tokens is None:
+        return total, unreported + 1
+    return total + tokens, unreported
+
+
+def token_report(total: int, unreported: int) -> str:
+    if not unreported:
+        return str(total)
+    return f"{total} (+ {unreported} replies with no usage reported)"
+
+
+# Chunks still read after the coordinate, waiting for the final chunk with token usage
+USAGE_GRACE_CHUNKS = 8
+
+
+async def astream_move(agent, prompt) -> AIMessage:
+    """
+    Stream the model's reply and stop reading soon after it contains a coordinate,
+    so a chatty model is cut off after a few tokens. Returns the chunks merged so far.
+    Providers send token usage on the final chunk, so up to USAGE_GRACE_CHUNKS more
+    chunks are read for it; a reply cut off before then has no usage_metadata.
+    Models without native streaming fall back to a single ainvoke inside astream.
+    """
+    stream = agent.astream(prompt)
+    message = None
+    extra = None  # Chunks read since the coordinate appeared
+    try:
+        async for chunk in stream:
+            message = chunk if message is None else message + chunk
+            if extra is None:
+                if _COORD_RE.search(message.content):
+                    extra = 0
+            elif chunk.usage_metadata:
+                break
+            else:
+                extra += 1
+                if extra >= USAGE_GRACE_CHUNKS:
+                    break
+    finally:
+        await stream.aclose()  # Drops the connection, so the server stops generating
+    return message if message is not None else AIMessage(content='')
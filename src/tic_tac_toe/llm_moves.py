@@ -0,0 +1,181 @@
+"""LLM move plumbing shared by both games: prompts, asking for a move, and speculation."""
+import asyncio
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from .core_functions import valid_move_bits, parse_coord, reported_tokens, astream_move, add_tokens, token_report
+from .move_cache import MoveCache
+
+
+def load_prompt(filename: str) -> str:
+    """Load a prompt from the prompts directory."""
+    # From src/tic_tac_toe/file.py, go up to src/, then into prompts/
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    prompt_path = os.path.join(base_dir, 'prompts', filename)
+    with open(prompt_path, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+
+SYSTEM_PROMPT = load_prompt('system_prompt.txt')
+PLAYER_TEMPLATE = load_prompt('player_template.txt')
+# PLAYER_TEMPLATE with {{MOVES}}/{{BOARD}}/{{SYMBOL}} turned into str.format fields (other braces escaped),
+# so each move fills the template in a single pass
+PLAYER_FORMAT = (PLAYER_TEMPLATE.replace('{', '{{').replace('}', '}}')
+                 .replace('{{{{MOVES}}}}', '{moves}')
+                 .replace('{{{{BOARD}}}}', '{board}')
+                 .replace('{{{{SYMBOL}}}}', '{symbol}'))
+# One shared instance so every request starts with an identical prefix the server can reuse
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+
+
+def build_messages(rendered: str, move_log: list[str], symbol: str) -> list:
+    """Build the chat messages for `symbol` to play on the rendered board.
+
+    Static text comes first and the append-only move log before the board, so
+    successive requests share the longest possible prefix.
+    """
+    prompt = PLAYER_FORMAT.format_map({'moves': '\n'.join(move_log) or '(none)',
+                                       'board': rendered, 'symbol': symbol})
+    return [SYSTEM_MESSAGE, HumanMessage(content=prompt)]
+
+
+def position_key(symbol: str, x_bits: int, o_bits: int) -> tuple[str, int]:
+    """Key for `symbol` to move: both 9-bit boards packed into one 18-bit int."""
+    return symbol, (x_bits << 9) | o_bits
+
+
+def settle(response: AIMessage, cache: MoveCache, model: str,
+           x_bits: int, o_bits: int) -> tuple[tuple[int, int], int | None]:
+    """(coord, tokens) from an LLM reply; legal answers are cached for `model`."""
+    coord = parse_coord(response.content)
+    if coord is None:
+        raise ValueError(f"unparsable move: {response}")
+    if valid_move_bits(x_bits | o_bits, *coord):
+        cache.put(model, x_bits, o_bits, coord)
+    return coord, reported_tokens(response)
+
+
+async def ask_move(agent, cache: MoveCache, model: str, symbol: str, rendered: str, move_log: list[str],
+                   x_bits: int, o_bits: int) -> tuple[tuple[int, int], int | None]:
+    """Stream one move for `symbol` from `agent` and settle it."""
+    response = await astream_move(agent, build_messages(rendered, move_log, symbol))
+    return settle(response, cache, model, x_bits, o_bits)
+
+
+class Speculation:
+    """
+    LLM calls started before their position comes up, keyed by position_key.
+    At most `limit` of them (a batch counts once) talk to the provider at a time.
+    What the discarded ones cost is tallied apart from the players' own tokens.
+    """
+
+    def __init__(self, limit: int = 9):
+        self._size = limit
+        self._limit: asyncio.Semaphore | None = None
+        self._tasks: dict[tuple[str, int], asyncio.Task] = {}
+        # Running batch tasks, each with the item tasks still waiting on it
+        self._batches: dict[asyncio.Task, set[asyncio.Task]] = {}
+        self.wasted_tokens = 0  # Usage of finished replies nobody read
+        self.wasted_unreported = 0  # Finished replies nobody read that reported no usage
+        self.cancelled_calls = 0  # Requests cut off mid-flight; the provider may still bill them
+
+    @property
+    def limit(self) -> asyncio.Semaphore:
+        # Made on first use, inside the running loop, not when the module is imported
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self._size)
+        return self._limit
+
+    def __contains__(self, key) -> bool:
+        return key in self._tasks
+
+    async def _limited(self, call, requests: int = 1):
+        async with self.limit:
+            try:
+                return await call()
+            except asyncio.CancelledError:
+                self.cancelled_calls += requests
+                raise
+
+    def _waste(self, result):
+        # A (coord, tokens) reply that was paid for but never played
+        if not isinstance(result, BaseException):
+            self.wasted_tokens, self.wasted_unreported = add_tokens(self.wasted_tokens, self.wasted_unreported,
+                                                                    result[1])
+
+    def _discard(self, task: asyncio.Task):
+        if task.done():
+            if not task.cancelled() and task.exception() is None:
+                self._waste(task.result())
+        else:
+            task.cancel()
+
+    def start(self, key, call):
+        """Run the coroutine function `call` for `key` unless one is already running."""
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._limited(call))
+
+    def start_batch(self, keys: list, call):
+        """Run `call`, whose result list lines up with `keys`, and track each result under its key."""
+        batch = asyncio.create_task(self._limited(call, len(keys)))
+        items = self._batches[batch] = set()
+        dropped: list[int] = []  # Indices of items cancelled while the batch was still running
+        batch.add_done_callback(lambda b: self._finish_batch(b, dropped))
+        for index, key in enumerate(keys):
+            item = asyncio.create_task(_batch_item(batch, index))
+            items.add(item)
+            item.add_done_callback(lambda i, b=batch, k=index: self._release(b, i, k, dropped))
+            self._tasks[key] = item
+
+    def _release(self, batch: asyncio.Task, item: asyncio.Task, index: int, dropped: list[int]):
+        if not item.cancelled():
+            return
+        if batch.done():
+            if not batch.cancelled() and batch.exception() is None:
+                self._waste(batch.result()[index])
+            return
+        dropped.append(index)
+        # Once no item is waiting on a batch, nobody will read its results: stop paying for it
+        items = self._batches.get(batch)
+        if items is not None:
+            items.discard(item)
+            if not items:
+                batch.cancel()
+
+    def _finish_batch(self, batch: asyncio.Task, dropped: list[int]):
+        self._batches.pop(batch, None)
+        if not batch.cancelled() and batch.exception() is None:
+            for index in dropped:
+                self._waste(batch.result()[index])
+
+    def pop(self, key) -> asyncio.Task | None:
+        return self._tasks.pop(key, None)
+
+    def cancel(self, keep=None):
+        """Cancel every speculative call except the one for `keep`."""
+        for key in [k for k in self._tasks if k != keep]:
+            self._discard(self._tasks.pop(key))
+
+    async def stop(self):
+        """Cancel every speculative call and batch, and wait until they have all finished."""
+        tasks = list(self._tasks.values()) + list(self._batches)
+        self._tasks.clear()
+        for task in tasks:
+            self._discard(task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def waste_report(self) -> str:
+        """Describe what discarded speculation cost since the last report, and start counting afresh."""
+        report = (f"{token_report(self.wasted_tokens, self.wasted_unreported)}, "
+                  f"plus {self.cancelled_calls} calls cancelled mid-flight")
+        self.wasted_tokens = self.wasted_unreported = self.cancelled_calls = 0
+        return report
+
+
+async def _batch_item(batch: asyncio.Task, index: int):
+    # Shielded so cancelling one mispredicted branch leaves the shared batch running
+    result = (await asyncio.shield(batch))[index]
+    if isinstance(result, Exception):
+        raise result
+    return result
@@ -0,0 +1,141 @@
+"""Persistent LLM move cache keyed by the canonical (symmetry-reduced) board."""
+import os
+import shelve
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Overrides where the shelve is kept (default: the user's cache directory)
+CACHE_ENV = 'TIC_TAC_TOE_MOVE_CACHE'
+
+
+class CacheInUseError(RuntimeError):
+    """Another process has the move cache open."""
+
+
+def _transform(f):
+    # SYMS[s][k] is the original cell that lands on cell k under symmetry s
+    return tuple(r * 3 + c for r, c in (f(k // 3, k % 3) for k in range(9)))
+
+
+SYMS: list[tuple[int, ...]] = [
+    _transform(lambda r, c: (r, c)),  # identity
+    _transform(lambda r, c: (2 - c, r)),  # rotate 90
+    _transform(lambda r, c: (2 - r, 2 - c)),  # rotate 180
+    _transform(lambda r, c: (c, 2 - r)),  # rotate 270
+    _transform(lambda r, c: (r, 2 - c)),  # mirror left/right
+    _transform(lambda r, c: (2 - r, c)),  # mirror top/bottom
+    _transform(lambda r, c: (c, r)),  # main diagonal
+    _transform(lambda r, c: (2 - c, 2 - r)),  # anti-diagonal
+]
+# INV_SYMS[s][cell] is where original `cell` lands under symmetry s
+INV_SYMS: list[tuple[int, ...]] = [tuple(p.index(cell) for cell in range(9)) for p in SYMS]
+
+
+def _apply(bits: int, perm: tuple[int, ...]) -> int:
+    out = 0
+    for k, src in enumerate(perm):
+        out |= ((bits >> src) & 1) << k
+    return out
+
+
+def canonicalize(x_bits: int, o_bits: int) -> tuple[int, int]:
+    """Return (key, sym): the smallest (x << 9 | o) over all 8 symmetries and the one used."""
+    return min(((_apply(x_bits, p) << 9) | _apply(o_bits, p), s) for s, p in enumerate(SYMS))
+
+
+def cache_path() -> Path:
+    """$TIC_TAC_TOE_MOVE_CACHE if set, else move_cache.db under the user's cache directory."""
+    override = os.environ.get(CACHE_ENV)
+    if override:
+        return Path(override)
+    base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or Path.home() / '.cache'
+    return Path(base) / 'agentic_tic_tac_toe' / 'move_cache.db'
+
+
+def _lock(path: Path):
+    """Hold an exclusive lock on `path`.lock for as long as the returned file stays open."""
+    lock_file = open(f"{path}.lock", 'a+b')
+    try:
+        if os.name == 'nt':
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise CacheInUseError(f"move cache {path} is in use by another process; "
+                              f"set {CACHE_ENV} to use a different file") from None
+    return lock_file
+
+
+def _unlock(lock_file):
+    if os.name == 'nt':
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    lock_file.close()
+
+
+def lookup(db, model: str, x_bits: int, o_bits: int) -> tuple[int, int] | None:
+    """Cached (row, col) for this position, mapped back onto the actual board."""
+    key, sym = canonicalize(x_bits, o_bits)
+    cell = db.get(f"{model}:{key}")
+    if cell is None:
+        return None
+    cell = SYMS[sym][cell]
+    return cell // 3, cell % 3
+
+
+def store(db, model: str, x_bits: int, o_bits: int, coord: tuple[int, int]):
+    key, sym = canonicalize(x_bits, o_bits)
+    db[f"{model}:{key}"] = INV_SYMS[sym][coord[0] * 3 + coord[1]]
+
+
+class MoveCache:
+    """
+    Answered moves per model: a dict of exact positions in front of the shelve,
+    which is only open between open() and close() (one game at a time).
+    The shelve lives at `path`, or cache_path() when that is None.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None):
+        self.path = path
+        self._memory: dict[tuple[str, int], tuple[int, int]] = {}
+        self._db = None
+        self._lock_file = None
+
+    def open(self):
+        """Open the shelve; raises CacheInUseError if another process already has it open."""
+        path = Path(self.path) if self.path is not None else cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = _lock(path)
+        try:
+            self._db = shelve.open(str(path))
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()  # Flushes new moves to disk
+            self._db = None
+        if self._lock_file is not None:
+            _unlock(self._lock_file)
+            self._lock_file = None
+
+    def get(self, model: str, x_bits: int, o_bits: int) -> tuple[int, int] | None:
+        key = (model, (x_bits << 9) | o_bits)  # Both bitboards packed into one int
+        coord = self._memory.get(key)
+        if coord is None and self._db is not None:
+            coord = lookup(self._db, model, x_bits, o_bits)
+            if coord is not None:
+                self._memory[key] = coord
+        return coord
+
+    def put(self, model: str, x_bits: int, o_bits: int, coord: tuple[int, int]):
+        self._memory[(model, (x_bits << 9) | o_bits)] = coord
+        if self._db is not None:
+            store(self._db, model, x_bits, o_bits, coord)
@@ -0,0 +1,95 @@
+"""Exact tic-tac-toe solver over bitboards (negamax with alpha-beta pruning)."""
+from functools import cache, lru_cache
+
+from .core_functions import WIN_MASKS, FULL_BOARD
+
+# Center, corners, then edges: strong moves first prune the most
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+_INF = 100
+
+
+def _won(bits: int) -> bool:
+    return any(bits & m == m for m in WIN_MASKS)
+
+
+@lru_cache(maxsize=None)
+def _negamax(me: int, opp: int, alpha: int, beta: int) -> int:
+    """Score for the player to move: >0 win, 0 draw, <0 loss; quicker results score further from 0."""
+    occupied = me | opp
+    if _won(opp):
+        return -(10 - occupied.bit_count())
+    if occupied == FULL_BOARD:
+        return 0
+    best = -_INF
+    for cell in MOVE_ORDER:
+        bit = 1 << cell
+        if occupied & bit:
+            continue
+        score = -_negamax(opp, me | bit, -beta, -alpha)
+        if score > best:
+            best = score
+            if best > alpha:
+                alpha = best
+                if alpha >= beta:
+                    break
+    return best
+
+
+def scored_moves(x_bits: int, o_bits: int, symbol: str) -> list[tuple[int, int]]:
+    """Exact (score, cell) for every legal move of `symbol`."""
+    me, opp = (x_bits, o_bits) if symbol == 'X' else (o_bits, x_bits)
+    occupied = x_bits | o_bits
+    return [(-_negamax(opp, me | 1 << cell, -_INF, _INF), cell)
+            for cell in MOVE_ORDER if not occupied & 1 << cell]
+
+
+def best_move(x_bits: int, o_bits: int, symbol: str) -> tuple[int, int]:
+    """An optimal (row, col) for `symbol`."""
+    _, cell = max(scored_moves(x_bits, o_bits, symbol), key=lambda sc: sc[0])
+    return cell // 3, cell % 3
+
+
+def forced_move(x_bits: int, o_bits: int, symbol: str) -> tuple[int, int] | None:
+    """The (row, col) when exactly one move is optimal (win, must-block, last cell), else None."""
+    moves = scored_moves(x_bits, o_bits, symbol)
+    if not moves:
+        return None
+    top = max(score for score, _ in moves)
+    best = [cell for score, cell in moves if score == top]
+    if len(best) != 1:
+        return None
+    return best[0] // 3, best[0] % 3
+
+
+@cache
+def _opening_book() -> dict[tuple[str, int, int], tuple[int, int]]:
+    """best_move for every position of plies 1-3 (at most one stone each), keyed by (symbol, x_bits, o_bits)."""
+    book = {(symbol, 0, 0): best_move(0, 0, symbol) for symbol in 'XO'}
+    for a in range(9):
+        book[('O', 1 << a, 0)] = best_move(1 << a, 0, 'O')
+        book[('X', 0, 1 << a)] = best_move(0, 1 << a, 'X')
+        for b in range(9):
+            if a != b:
+                for symbol in 'XO':
+                    book[(symbol, 1 << a, 1 << b)] = best_move(1 << a, 1 << b, symbol)
+    return book
+
+
+def book_move(x_bits: int, o_bits: int, symbol: str) -> tuple[int, int] | None:
+    """The opening-book (row, col) for `symbol` in the first three plies, else None."""
+    return _opening_book().get((symbol, x_bits, o_bits))
+
+
+def strategy_move(x_bits: int, o_bits: int, symbol: str) -> tuple[int, int] | None:
+    """A move the rules force: immediate win, then must-block, then the last empty cell; else None."""
+    me, opp = (x_bits, o_bits) if symbol == 'X' else (o_bits, x_bits)
+    empty = ~(x_bits | o_bits) & FULL_BOARD
+    for bits in (me, opp):  # Immediate win first, then block
+        for m in WIN_MASKS:
+            if (bits & m).bit_count() == 2 and m & empty:
+                cell = (m & empty).bit_length() - 1
+                return cell // 3, cell % 3
+    if empty.bit_count() == 1:
+        cell = empty.bit_length() - 1
+        return cell // 3, cell % 3
+    return None
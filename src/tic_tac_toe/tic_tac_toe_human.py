@@ -4,7 +4,9 @@ import asyncio
 import os
 import sys
 import threading
+import uuid
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
 
 # Add src directory to path for imports
@@ -12,10 +14,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.game_console import PygameGame
-from src.tic_tac_toe.core_functions import valid_move, check_winner, parse_coord, get_token_used
+from src.tic_tac_toe.core_functions import valid_move_bits, check_winner_bits, render_board, add_tokens, token_report
+from src.tic_tac_toe.llm_moves import position_key, ask_move, Speculation
+from src.tic_tac_toe.move_cache import MoveCache
+from src.tic_tac_toe.solver import best_move, book_move, forced_move
 
 from dotenv import load_dotenv
-from langchain_core.messages import AIMessage
 from src.llms.llm_options import get_llm, get_llm_options
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command
@@ -29,25 +33,24 @@ score: dict[str, int] = {
 load_dotenv()
 player_one_model_name = None  # Will be set from dropdown selection
 player_two_model = 'human'
+# True: the local solver plays every AI move. Even when False, the LLM is only asked in
+# positions past the opening book with more than one optimal move and no cached answer
+USE_LOCAL_SOLVER_ONLY = False
 os.environ["LANGSMITH_TRACING_V2"] = 'false'
 
 
-def load_prompt(filename: str) -> str:
-    """Load a prompt from the prompts directory."""
-    # From src/tic_tac_toe/file.py, go up to src/, then into prompts/
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    prompt_path = os.path.join(base_dir, 'prompts', filename)
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read().strip()
-
-
-SYSTEM_PROMPT = load_prompt('system_prompt.txt')
-PLAYER_TEMPLATE = load_prompt('player_template.txt')
+# Answered moves, kept across games; its shelve is open while a game runs
+_cache = MoveCache()
+# AI replies requested while the human is thinking, one per possible human move
+_speculation = Speculation(limit=9)
 
 # Initialize pygame game instance
 pygame_game = PygameGame()
-restart_game_event = threading.Event()
-continue_running = True
+
+
+# Console rendering for print_box, indexed by cell byte
+_CELL_RENDER = {ord('.'): '   ', ord('X'): ' X ', ord('O'): ' O '}
+_LINE_FMT = '|{} {} {}|'
 
 
 class Context(TypedDict):
@@ -55,36 +58,43 @@ class Context(TypedDict):
 
 
 # Use dataclass for state with default values
-@dataclass
+@dataclass(slots=True)
 class State:
     moves: tuple[int, int] = None
     game_status: str = None
-    board: list[list[str]] = field(default_factory=lambda: [['.' for _ in range(3)] for _ in range(3)])
+    board_bytes: bytearray = field(default_factory=lambda: bytearray(b'.........'))  # Row-major, for prompt/UI
+    move_log: list[str] = field(default_factory=list)  # "symbol:row,col", oldest first
+    x_bits: int = 0  # Bitboards driving validation and win checks
+    o_bits: int = 0
     last_player: str = None
     player_one_token: int = 0
     player_two_token: int = 0
+    player_one_unreported: int = 0  # AI replies whose token usage was never reported
     invalid_move_count: int = 0  # Track consecutive invalid moves
 
+    def board_str(self) -> str:
+        return render_board(self.board_bytes)
+
     def print_box(self):
-        for row in self.board:
-            line = " ".join("   " if c == "." else f" {c} " for c in row)
-            print(f"|{line}|")
+        b = self.board_bytes
+        for r in range(0, 9, 3):
+            print(_LINE_FMT.format(_CELL_RENDER[b[r]], _CELL_RENDER[b[r + 1]], _CELL_RENDER[b[r + 2]]))
 
     def valid(self, i, j):
-        return 0 <= i < 3 and 0 <= j < 3 and self.board[i][j] == '.'
+        return 0 <= i < 3 and 0 <= j < 3 and self.board_bytes[i * 3 + j] == ord('.')
 
 
 async def coordinator_node(state: State):
     if state.last_player is None:
         return Command(
-            update={"board": state.board, "invalid_move_count": 0},
+            update={"invalid_move_count": 0},
             goto="player_one_node"  # Route directly here as game begis
         )
 
     i, j = state.moves
     symbol = state.last_player
     # Validate move
-    if not valid_move(state.board, i, j):
+    if not valid_move_bits(state.x_bits | state.o_bits, i, j):
         # Increment invalid move counter
         new_count = state.invalid_move_count + 1
         print(f"[DEBUG] Invalid move ({i}, {j}) by {symbol}. Attempt {new_count}/3")
@@ -104,11 +114,17 @@ async def coordinator_node(state: State):
             )
 
     # Valid move - reset invalid move counter
-    state.board[i][j] = symbol  # Apply move
+    state.board_bytes[i * 3 + j] = ord(symbol)  # Apply move
+    state.move_log.append(f"{symbol}:{i},{j}")
+    x_bits, o_bits = state.x_bits, state.o_bits
+    if symbol == 'X':
+        x_bits |= 1 << (i * 3 + j)
+    else:
+        o_bits |= 1 << (i * 3 + j)
     state.print_box()
 
     # Check win conditions first
-    result = check_winner(state.board)
+    result = check_winner_bits(x_bits, o_bits)
 
     # Update pygame display with new board state
     game_status = None
@@ -123,18 +139,19 @@ async def coordinator_node(state: State):
         else:
             pygame_game.update_score('AI')
     # Re-enable model selection when game ends (both DRAW and WINNER)
-    pygame_game.set_model_selection_enabled(True)
-    pygame_game.update_board(state.board, state.last_player, game_status)
+    if game_status is not None:
+        pygame_game.set_model_selection_enabled(True)
+    pygame_game.update_board(state.board_bytes, state.last_player, game_status)
 
     if result == 'DRAW':
-        print(f'{result}:\n{state.board}')
+        print(f'{result}:\n{state.board_str()}')
         return Command(
             update={"game_status": f"DRAW."},
             goto=END
         )
     if result in ('X', 'O'):
         winner = player_two_model if result == 'X' else player_one_model_name
-        print(state.board)
+        print(state.board_str())
         return Command(
             update={"game_status": f"WINNER {winner}"},
             goto=END
@@ -143,7 +160,9 @@ async def coordinator_node(state: State):
     # Determine next player
     next_player = "player_two_node" if state.last_player == 'O' else "player_one_node"
     return Command(
-        update={"board": state.board, "invalid_move_count": 0},  # Reset counter on valid move
+        update={"board_bytes": state.board_bytes, "move_log": state.move_log,
+                "x_bits": x_bits, "o_bits": o_bits,
+                "invalid_move_count": 0},  # Reset counter on valid move
         goto=next_player  # All routing logic HERE
     )
 
@@ -162,12 +181,10 @@ def get_human_move(state):
 # ============ ASYNC EXECUTION ============
 async def run_single_game():
     """Execute a single game asynchronously with pygame UI"""
-    import uuid
-
     # Get selected model from dropdown and create agent
     selected_model = pygame_game.get_selected_model()
     print(f"[DEBUG] Starting new game with model: {selected_model}")
-    player_one_agent = get_llm(selected_model)
+    player_one_agent = get_llm(selected_model)  # Cached per model in llm_options
 
     # Update global for coordinator access
     global player_one_model_name
@@ -179,26 +196,38 @@ async def run_single_game():
     # Disable model selection during gameplay
     pygame_game.set_model_selection_enabled(False)
 
+    _cache.open()
+
+    async def ask_player_one(board, move_log, x_bits: int, o_bits: int) -> tuple[tuple[int, int], int | None]:
+        """Return (coord, tokens) for the AI, from the solver or persistent cache when possible."""
+        if USE_LOCAL_SOLVER_ONLY:
+            return best_move(x_bits, o_bits, "O"), 0
+        # No need to ask the LLM in the opening, or when only one move is optimal
+        coord = book_move(x_bits, o_bits, "O") or forced_move(x_bits, o_bits, "O")
+        if coord is None:
+            coord = _cache.get(player_one_model_name, x_bits, o_bits)
+        if coord is not None:
+            return coord, 0
+        return await ask_move(player_one_agent, _cache, player_one_model_name, "O",
+                              render_board(board), move_log, x_bits, o_bits)
+
     # Define node functions that capture fresh agents via closure
     async def player_one_node(state: State):
         print(f'{player_one_model_name} move:')
 
-        prompt = (PLAYER_TEMPLATE
-                  .replace("{{SYMBOL}}", "O")
-                  .replace("{{BOARD}}", str(state.board)))
-        prompt = SYSTEM_PROMPT + '\n' + prompt
-        response: AIMessage = await player_one_agent.ainvoke(prompt)
-
-        coord = parse_coord(response.content)
-        if coord is None:
-            raise ValueError(f"unparsable move: {response}")
-        p1_token_used_till_now = state.player_one_token + get_token_used(response)
+        # Reuse the reply speculated during the human's turn, if any
+        task = _speculation.pop(position_key("O", state.x_bits, state.o_bits))
+        if task is not None:
+            coord, tokens = await task
+        else:
+            coord, tokens = await ask_player_one(state.board_bytes, state.move_log, state.x_bits, state.o_bits)
+        p1_token_used_till_now, p1_unreported = add_tokens(state.player_one_token, state.player_one_unreported, tokens)
 
         return Command(
-            update={"board": state.board,
-                    'last_player': "O",
+            update={'last_player': "O",
                     'moves': coord,
-                    'player_one_token': p1_token_used_till_now
+                    'player_one_token': p1_token_used_till_now,
+                    'player_one_unreported': p1_unreported
                     },
             goto='coordinator_node'
         )
@@ -206,16 +235,37 @@ async def run_single_game():
     async def player_two_node(state: State):
         print(f'{player_two_model} move:')
 
-        # Run blocking human move in thread pool to avoid blocking event loop
-        loop = asyncio.get_running_loop()
-        coord = await loop.run_in_executor(None, lambda: get_human_move(state))
+        # Ask the AI about every non-terminal human reply while waiting
+        _speculation.cancel()
+        occupied = state.x_bits | state.o_bits
+        for cell in range(9):
+            if occupied >> cell & 1:
+                continue
+            x_bits = state.x_bits | 1 << cell
+            if check_winner_bits(x_bits, state.o_bits) is not None:
+                continue
+            board = state.board_bytes.copy()
+            board[cell] = ord('X')
+            _speculation.start(position_key("O", x_bits, state.o_bits),
+                               partial(ask_player_one, board, state.move_log + [f"X:{cell // 3},{cell % 3}"],
+                                       x_bits, state.o_bits))
+
+        # Run blocking human move in a worker thread to avoid blocking event loop
+        coord = await asyncio.to_thread(get_human_move, state)
 
         if coord is None:
+            _speculation.cancel()
             raise ValueError(f"unparsable move: {coord}")
 
+        # Keep only the branch the human actually played
+        i, j = coord
+        if valid_move_bits(occupied, i, j):
+            _speculation.cancel(keep=position_key("O", state.x_bits | 1 << (i * 3 + j), state.o_bits))
+        else:
+            _speculation.cancel()
+
         p2_token_used_till_now = state.player_two_token + 0
-        return Command(update={"board": state.board,
-                               'last_player': "X",
+        return Command(update={'last_player': "X",
                                'moves': coord,
                                'player_two_token': p2_token_used_till_now},
                        goto='coordinator_node')
@@ -230,59 +280,71 @@ async def run_single_game():
         .add_edge("player_one_node", "coordinator_node")
         .add_edge("player_two_node", "coordinator_node")
     )
-    graph = builder.compile()
+    # No checkpointer: state stays in memory and is never serialized between nodes
+    graph = builder.compile(checkpointer=None)
 
     # Run the game
     my_trace_id = str(uuid.uuid4())
-    result = await graph.ainvoke(
-        State(),
-        config={
-            "configurable": {"game_id": my_trace_id},
-            "run_id": my_trace_id,
-            "run_name": f"[{player_one_model_name}]_vs_[{player_two_model}]",
-        }
-    )
+    try:
+        result = await graph.ainvoke(
+            State(),
+            config={
+                "configurable": {"game_id": my_trace_id},
+                "run_id": my_trace_id,
+                "run_name": f"[{player_one_model_name}]_vs_[{player_two_model}]",
+            }
+        )
+    finally:
+        await _speculation.stop()  # Nothing may write to the shelve once it is closed
+        _cache.close()
     print('*' * 20)
     print(
         f"Final result: {result['game_status']} , "
-        f"\n{player_one_model_name} tokens: {result['player_one_token']}, "
-        f"\n{player_two_model} tokens: {result['player_two_token']}"
+        f"\n{player_one_model_name} tokens: {token_report(result['player_one_token'], result['player_one_unreported'])}, "
+        f"\n{player_two_model} tokens: {result['player_two_token']}, "
+        f"\nspeculative tokens (discarded): {_speculation.waste_report()}"
     )
     print('*' * 20)
 
 
-def run_async_in_thread():
-    """Run the async game logic in a separate thread with restart support."""
-    global continue_running
+async def _game_loop():
+    """Play games back to back on one event loop until the user closes the window."""
+    control: asyncio.Queue[str] = asyncio.Queue()
+    pygame_game.set_control_queue(asyncio.get_running_loop(), control)
 
-    while continue_running:
-        try:
-            # Use new_event_loop for each game to avoid closed loop error
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(run_single_game())
-            loop.close()
+    try:
+        while not pygame_game.shutdown_requested:
+            game = asyncio.create_task(run_single_game())
+            command = asyncio.create_task(control.get())
+            await asyncio.wait((game, command), return_when=asyncio.FIRST_COMPLETED)
+            if command.done() and command.result() != 'restart':
+                # Window closed, possibly mid-game: let the game clean up before leaving
+                game.cancel()
+                await asyncio.gather(game, return_exceptions=True)
+                return
+            await game  # Surface game errors
 
             # Game complete - wait for user action (restart or close)
-            if pygame_game.shutdown_event.is_set():
-                break
-
             print(f"[DEBUG] Game ended. Waiting for restart event...")
-            pygame_game.restart_event.wait()
+            if await command != 'restart':
+                return
+            # A close queued behind the restart wins, so no game starts only to be cancelled
+            while not control.empty():
+                if control.get_nowait() != 'restart':
+                    return
+            print(f"[DEBUG] Restart event detected! Resetting game...")
+            pygame_game.reset_game()
+    finally:
+        pygame_game.set_control_queue(None, None)
 
-            # Check if user wants to restart or close
-            if pygame_game.restart_event.is_set() and continue_running:
-                print(f"[DEBUG] Restart event detected! Resetting game...")
-                pygame_game.reset_game()
-                pygame_game.restart_event.clear()
-            else:
-                break
 
-        except Exception as e:
-            print(f"Game error: {e}")
-            continue_running = False
-            pygame_game.shutdown_event.set()
-            break
+def run_async_in_thread():
+    """Run the async game logic in a separate thread with restart support."""
+    try:
+        # One loop for the whole session keeps LLM connections warm between games
+        asyncio.run(_game_loop())
+    except Exception as e:
+        print(f"Game error: {e}")
 
 
 # ============ RUN ============
@@ -303,8 +365,7 @@ if __name__ == "__main__":
         pygame_game.run_event_loop()
     finally:
         # Signal to stop game
-        continue_running = False
-        pygame_game.restart_event.set()
+        pygame_game.request_shutdown()
         # Wait for game thread to complete
         game_thread.join(timeout=5)
         # Clean shutdown
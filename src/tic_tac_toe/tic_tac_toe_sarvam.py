@@ -1,20 +1,26 @@
 import warnings
 warnings.simplefilter("ignore", UserWarning)
 import asyncio
+import atexit
 import os
+import sys
+import uuid
 from dataclasses import dataclass, field
+from functools import cache, partial
 from dotenv import load_dotenv
-from langchain_core.messages import AIMessage
-from langfuse import get_client
+from langfuse import Langfuse
 from langfuse import observe
 from langfuse.langchain import CallbackHandler
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command
 from typing_extensions import TypedDict
 
-from src.llms.llm_options import get_llm
-from src.tic_tac_toe.core_functions import valid_move, check_winner, parse_coord
-from src.tic_tac_toe.tic_tac_toe_human import get_token_used
+from src.llms.llm_options import get_llm, aclose_llms
+from src.tic_tac_toe.core_functions import (valid_move_bits, check_winner_bits, render_board, add_tokens,
+                                            token_report)
+from src.tic_tac_toe.llm_moves import build_messages, position_key, settle, ask_move, Speculation
+from src.tic_tac_toe.move_cache import MoveCache
+from src.tic_tac_toe.solver import strategy_move
 
 load_dotenv()
 
@@ -23,29 +29,117 @@ player_two_model = 'sarvam'
 os.environ["LANGSMITH_TRACING_V2"] = 'false'
 os.environ["LANGSMITH_PROJECT"] = f"[{player_one_model}]_vs_[{player_two_model}]"
 
-# Verify connection
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
-if langfuse.auth_check():
-    print("Langfuse client is authenticated and ready!")
-else:
-    print("Authentication failed. Please check your credentials and host.")
 
+@cache
+def get_langfuse_handler() -> CallbackHandler:
+    """Langfuse callback handler, created (and the connection verified) on first use."""
+    # Spans are queued and exported in batches by Langfuse's background thread, so
+    # finishing a node never waits on the network; get_client() returns this instance
+    langfuse = Langfuse(flush_at=50, flush_interval=30)
+    if langfuse.auth_check():
+        print("Langfuse client is authenticated and ready!")
+    else:
+        print("Authentication failed. Please check your credentials and host.")
+    atexit.register(langfuse.shutdown)  # Flushes pending traces once, when the process exits
+    return CallbackHandler()
 
-def load_prompt(filename: str) -> str:
-    """Load a prompt from the prompts directory."""
-    # From src/tic_tac_toe/file.py, go up to src/, then into prompts/
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    prompt_path = os.path.join(base_dir, 'prompts', filename)
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read().strip()
 
+MODELS = {'O': player_one_model, 'X': player_two_model}
 
-SYSTEM_PROMPT = load_prompt('system_prompt.txt')
-PLAYER_TEMPLATE = load_prompt('player_template.txt')
 
-player_one_agent = get_llm(player_one_model)
-player_two_agent = get_llm(player_two_model)
+def _same_backend(a, b) -> bool:
+    """True when both clients talk to the same model on the same server."""
+    return a is b or (type(a) is type(b)
+                      and getattr(a, 'base_url', None) == getattr(b, 'base_url', None)
+                      and getattr(a, 'model', None) == getattr(b, 'model', None))
+
+
+# Clients are built on first use, so importing this module stays cheap and offline
+@cache
+def get_p1_agent():
+    return get_llm(player_one_model)
+
+
+@cache
+def get_p2_agent():
+    return get_llm(player_two_model)
+
+
+def get_agent(symbol: str):
+    return get_p1_agent() if symbol == 'O' else get_p2_agent()
+
+
+def get_batch_agent(symbol: str):
+    """Client used to batch `symbol`'s requests; players sharing a backend share one."""
+    if symbol == 'X' and not _same_backend(get_p1_agent(), get_p2_agent()):
+        return get_p2_agent()
+    return get_p1_agent()
+
+
+# Answered moves, shared by every game in this process; its shelve is open while a game runs
+_cache = MoveCache()
+# While one player thinks, the other player's reply to each of its legal moves is requested
+_speculation = Speculation(limit=9)
+
+EMPTY_RENDERED = render_board(b'.........')
+
+
+def _cached_move(symbol: str, x_bits: int, o_bits: int) -> tuple[int, int] | None:
+    """Move known without asking the LLM: a forced move, or a cached answer."""
+    coord = strategy_move(x_bits, o_bits, symbol)
+    if coord is not None:
+        return coord
+    return _cache.get(MODELS[symbol], x_bits, o_bits)
+
+
+async def _ask_batch(agent, requests: list[tuple]) -> list:
+    """One abatch call for several (symbol, rendered, move_log, x_bits, o_bits) requests."""
+    responses = await agent.abatch([build_messages(rendered, move_log, symbol)
+                                    for symbol, rendered, move_log, _, _ in requests],
+                                   return_exceptions=True)
+    results = []
+    for (symbol, _, _, x_bits, o_bits), response in zip(requests, responses):
+        try:
+            results.append(response if isinstance(response, Exception)
+                           else settle(response, _cache, MODELS[symbol], x_bits, o_bits))
+        except ValueError as e:
+            results.append(e)
+    return results
+
+
+def _ask(symbol: str, rendered: str, move_log: list[str], x_bits: int, o_bits: int):
+    return ask_move(get_agent(symbol), _cache, MODELS[symbol], symbol, rendered, move_log, x_bits, o_bits)
+
+
+def _schedule_all(requests: list[tuple]):
+    """Speculate on (symbol, rendered, move_log, x_bits, o_bits) requests, batching per backend."""
+    groups: dict[int, list[tuple]] = {}
+    for symbol, rendered, move_log, x_bits, o_bits in requests:
+        if position_key(symbol, x_bits, o_bits) not in _speculation and _cached_move(symbol, x_bits, o_bits) is None:
+            groups.setdefault(id(get_batch_agent(symbol)), []).append(
+                (symbol, rendered, list(move_log), x_bits, o_bits))
+    for group in groups.values():
+        keys = [position_key(symbol, x_bits, o_bits) for symbol, _, _, x_bits, o_bits in group]
+        if len(group) == 1:
+            _speculation.start(keys[0], partial(_ask, *group[0]))
+        else:
+            _speculation.start_batch(keys, partial(_ask_batch, get_batch_agent(group[0][0]), group))
+
+
+async def _get_reply(symbol: str, state) -> tuple[tuple[int, int], int | None]:
+    """(coord, tokens) for `symbol` on the state's board: already running, cached, or a fresh call."""
+    task = _speculation.pop(position_key(symbol, state.x_bits, state.o_bits))
+    if task is not None:
+        return await task  # Its tokens were spent on this position, so they count
+    coord = _cached_move(symbol, state.x_bits, state.o_bits)
+    if coord is not None:
+        return coord, 0
+    return await _ask(symbol, state.rendered_board, state.move_log, state.x_bits, state.o_bits)
+
+
+# Console rendering for print_box, indexed by cell byte
+_CELL_RENDER = {ord('.'): '   ', ord('X'): ' X ', ord('O'): ' O '}
+_LINE_FMT = '|{} {} {}|'
 
 
 class Context(TypedDict):
@@ -53,85 +147,109 @@ class Context(TypedDict):
 
 
 # Use dataclass for state with default values
-@dataclass
+@dataclass(slots=True)
 class State:
     moves: tuple[int, int] = None
     game_status: str = None
-    board: list[list[str]] = field(default_factory=lambda: [['.' for _ in range(3)] for _ in range(3)])
+    board: bytearray = field(default_factory=lambda: bytearray(b'.........'))  # Row-major, index row * 3 + col
+    rendered_board: str = EMPTY_RENDERED  # Prompt view of board, rebuilt once per applied move
+    move_log: list[str] = field(default_factory=list)  # "symbol:row,col", oldest first
+    x_bits: int = 0  # Bitboards driving validation and win checks; board is kept for the prompt
+    o_bits: int = 0
     last_player: str = None
     player_one_token: int = 0
     player_two_token: int = 0
+    player_one_unreported: int = 0  # Replies whose token usage was never reported
+    player_two_unreported: int = 0
 
     def print_box(self):
-        for row in self.board:
-            line = " ".join("   " if c == "." else f" {c} " for c in row)
-            print(f"|{line}|")
+        for r in range(0, 9, 3):
+            print(_LINE_FMT.format(*(_CELL_RENDER[c] for c in self.board[r:r + 3])))
 
     def valid(self, i, j):
-        return 0 <= i < 3 and 0 <= j < 3 and self.board[i][j] == '.'
+        return 0 <= i < 3 and 0 <= j < 3 and self.board[i * 3 + j] == ord('.')
 
 
 @observe(name="coordinator_node")
 async def coordinator_node(state: State):
     if state.last_player is None:
         return Command(
-            update={"board": state.board},
+            update={},
             goto="player_one_node"  # Route directly here as game begis
         )
 
     i, j = state.moves
     symbol = state.last_player
     # Validate move
-    if not valid_move(state.board, i, j):
+    if not valid_move_bits(state.x_bits | state.o_bits, i, j):
         return Command(
             update={"game_status": f"Invalid move {(i, j)} by {symbol}"},
             goto=END
         )
 
-    state.board[i][j] = symbol  # Apply move
-    state.print_box()
-
-    result = check_winner(state.board)  # Check win conditions
+    state.board[i * 3 + j] = ord(symbol)  # Apply move
+    state.move_log.append(f"{symbol}:{i},{j}")
+    state.rendered_board = render_board(state.board)
+    x_bits, o_bits = state.x_bits, state.o_bits
+    if symbol == 'X':
+        x_bits |= 1 << (i * 3 + j)
+    else:
+        o_bits |= 1 << (i * 3 + j)
+    # Console output goes through a worker thread so a slow stdout never stalls the loop
+    await asyncio.to_thread(state.print_box)
+
+    result = check_winner_bits(x_bits, o_bits)  # Check win conditions
     if result == 'DRAW':
         return Command(
-            update={"game_status": f"DRAW. Board: {state.board}"},
+            update={"game_status": f"DRAW. Board:\n{state.rendered_board}"},
             goto=END
         )
     if result in ('X', 'O'):
         winner = player_two_model if result == 'X' else player_one_model
         return Command(
-            update={"game_status": f"WINNER {winner}. Final: {state.board}"},
+            update={"game_status": f"WINNER {winner}. Final:\n{state.rendered_board}"},
             goto=END
         )
 
+    # Overlap both players: start the opponent's call now, and this player's
+    # reply to every non-terminal opponent move alongside it
+    opponent = 'X' if symbol == 'O' else 'O'
+    _speculation.cancel(keep=position_key(opponent, x_bits, o_bits))
+    requests = [(opponent, state.rendered_board, state.move_log, x_bits, o_bits)]
+    occupied = x_bits | o_bits
+    for cell in range(9):
+        bit = 1 << cell
+        if occupied & bit:
+            continue
+        next_x, next_o = (x_bits | bit, o_bits) if opponent == 'X' else (x_bits, o_bits | bit)
+        if check_winner_bits(next_x, next_o) is None:
+            r, c = divmod(cell, 3)
+            pos = cell + r  # Skip the newline after each rendered row
+            rendered = state.rendered_board[:pos] + opponent + state.rendered_board[pos + 1:]
+            requests.append((symbol, rendered, state.move_log + [f"{opponent}:{r},{c}"], next_x, next_o))
+    _schedule_all(requests)
+
     # Determine next player
     next_player = "player_two_node" if state.last_player == 'O' else "player_one_node"
     return Command(
-        update={"board": state.board},
+        update={"board": state.board, "rendered_board": state.rendered_board,
+                "move_log": state.move_log, "x_bits": x_bits, "o_bits": o_bits},
         goto=next_player  # All routing logic HERE
     )
 
 
 @observe(name=player_one_model, as_type='agent')
 async def player_one_node(state: State):
-    print(f'{player_one_model} move:')
+    await asyncio.to_thread(print, f'{player_one_model} move:')
 
-    prompt = (PLAYER_TEMPLATE
-              .replace("{{SYMBOL}}", "O")
-              .replace("{{BOARD}}", str(state.board)))
-    prompt = SYSTEM_PROMPT + '\n' + prompt
-    response: AIMessage = await player_one_agent.ainvoke(prompt)
-
-    coord = parse_coord(response.content)
-    if coord is None:
-        raise ValueError(f"unparsable move: {response}")
-    p1_token_used_till_now = state.player_one_token + get_token_used(response)
+    coord, tokens = await _get_reply("O", state)
+    p1_token_used_till_now, p1_unreported = add_tokens(state.player_one_token, state.player_one_unreported, tokens)
 
     return Command(
-        update={"board": state.board,
-                'last_player': "O",
+        update={'last_player': "O",
                 'moves': coord,
-                'player_one_token': p1_token_used_till_now
+                'player_one_token': p1_token_used_till_now,
+                'player_one_unreported': p1_unreported
                 },
         goto='coordinator_node'
     )
@@ -139,22 +257,13 @@ async def player_one_node(state: State):
 
 @observe(name=player_two_model, as_type='agent')
 async def player_two_node(state: State):
-    print(f'{player_two_model} move:')
-    prompt = (PLAYER_TEMPLATE
-              .replace("{{SYMBOL}}", "X")
-              .replace("{{BOARD}}", str(state.board)))
-    prompt = SYSTEM_PROMPT + '\n' + prompt
-    # Manually create a span for the LLM call
-    response: AIMessage = await player_two_agent.ainvoke(prompt)
-    coord = parse_coord(response.content)
-    if coord is None:
-        raise ValueError(f"unparsable move: {coord}")
-
-    p2_token_used_till_now = state.player_two_token + get_token_used(response)
-    return Command(update={"board": state.board,
-                           'last_player': "X",
+    await asyncio.to_thread(print, f'{player_two_model} move:')
+    coord, tokens = await _get_reply("X", state)
+    p2_token_used_till_now, p2_unreported = add_tokens(state.player_two_token, state.player_two_unreported, tokens)
+    return Command(update={'last_player': "X",
                            'moves': coord,
-                           'player_two_token': p2_token_used_till_now},
+                           'player_two_token': p2_token_used_till_now,
+                           'player_two_unreported': p2_unreported},
                    goto='coordinator_node')
 
 
@@ -169,33 +278,57 @@ builder = (
     .add_edge("player_two_node", "coordinator_node")
 )
 
-graph = builder.compile()
+# No checkpointer: state stays in memory and is never serialized between nodes
+graph = builder.compile(checkpointer=None)
 
 
 # ============ ASYNC EXECUTION ============
 async def run_game_async():
     """Execute graph asynchronously"""
-    import uuid
+    _cache.open()
     my_trace_id = str(uuid.uuid4())
-    result = await graph.ainvoke(
-        State(),
-        config={
-            "callbacks": [langfuse_handler],
-            "configurable": {"game_id": my_trace_id},
-            "run_id": my_trace_id,
-            "run_name": f"[{player_one_model}]_vs_[{player_two_model}]",
-        }
-    )
+    langfuse_handler = await asyncio.to_thread(get_langfuse_handler)  # auth_check is a blocking request
+    try:
+        result = await graph.ainvoke(
+            State(),
+            config={
+                "callbacks": [langfuse_handler],
+                "configurable": {"game_id": my_trace_id},
+                "run_id": my_trace_id,
+                "run_name": f"[{player_one_model}]_vs_[{player_two_model}]",
+            }
+        )
+    finally:
+        await _speculation.stop()  # Nothing may write to the shelve once it is closed
+        _cache.close()
     print('*' * 20)
     print(
         f"Final result: {result['game_status']} , "
-        f"\n{player_one_model} tokens: {result['player_one_token']}, "
-        f"\n{player_two_model} tokens: {result['player_two_token']}"
+        f"\n{player_one_model} tokens: {token_report(result['player_one_token'], result['player_one_unreported'])}, "
+        f"\n{player_two_model} tokens: {token_report(result['player_two_token'], result['player_two_unreported'])}, "
+        f"\nspeculative tokens (discarded): {_speculation.waste_report()}"
     )
     print('* ' * 20)
-    get_client().shutdown()
+
+
+async def tournament(n: int = 1):
+    """Play n games on one event loop, so HTTP connection pools stay warm between games."""
+    try:
+        for _ in range(n):
+            await run_game_async()
+    finally:
+        # Only clients that were actually built; calling a getter here would create one
+        await aclose_llms(*(getter() for getter in (get_p1_agent, get_p2_agent)
+                            if getter.cache_info().currsize))
+        get_p1_agent.cache_clear()
+        get_p2_agent.cache_clear()
 
 
 # ============ RUN ============
 if __name__ == "__main__":
-    asyncio.run(run_game_async())
+    try:
+        import uvloop  # Optional faster event loop on Linux/macOS
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(tournament(int(sys.argv[1]) if len(sys.argv) > 1 else 1))
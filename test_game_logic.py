@@ -10,7 +10,11 @@ FAIL = "[FAIL]"
 # Add src directory to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-from tic_tac_toe.core_functions import valid_move, check_winner
+from tic_tac_toe.core_functions import (valid_move, check_winner, board_to_bits, check_winner_bits,
+                                        valid_move_bits, parse_coord, astream_move, get_token_used, reported_tokens,
+                                        USAGE_GRACE_CHUNKS)
+from tic_tac_toe.move_cache import canonicalize, SYMS, INV_SYMS
+from tic_tac_toe.solver import best_move, book_move, forced_move, strategy_move
 from dataclasses import dataclass, field
 
 
@@ -135,6 +139,301 @@ def test_invalid_move_reset():
         return False
 
 
+def test_bitboard_matches_board_logic():
+    """Test that bitboard win/move checks agree with the list-board versions."""
+    print("\n=== Test 5: Bitboard Logic ===")
+
+    boards = [
+        [['.', '.', '.'], ['.', '.', '.'], ['.', '.', '.']],  # empty
+        [['X', 'X', 'X'], ['O', 'O', '.'], ['.', '.', '.']],  # X row
+        [['O', 'X', '.'], ['O', 'X', '.'], ['O', '.', 'X']],  # O column
+        [['X', 'O', '.'], ['O', 'X', '.'], ['.', '.', 'X']],  # X diagonal
+        [['X', 'O', 'O'], ['X', 'O', '.'], ['O', 'X', 'X']],  # O anti-diagonal
+        [['X', 'O', 'X'], ['X', 'O', 'O'], ['O', 'X', 'X']],  # draw
+        [['X', 'O', '.'], ['.', 'O', '.'], ['.', '.', 'X']],  # ongoing
+    ]
+
+    for board in boards:
+        x_bits, o_bits = board_to_bits(board)
+        expected = check_winner(board)
+        result = check_winner_bits(x_bits, o_bits)
+        if result != expected:
+            print(f"  FAIL {board}: bitboard says {result}, expected {expected}")
+            return False
+        for i, j in [(r, c) for r in range(-1, 4) for c in range(-1, 4)]:
+            if valid_move_bits(x_bits | o_bits, i, j) != valid_move(board, i, j):
+                print(f"  FAIL {board}: valid_move mismatch at ({i}, {j})")
+                return False
+        print(f"  PASS {board} -> {result}")
+
+    return True
+
+
+def test_parse_coord():
+    """Test coordinate parsing for strict and free-form model output."""
+    print("\n=== Test 6: Coordinate Parsing ===")
+
+    test_cases = [
+        ("1,1", (1, 1)),
+        (" 0, 2\n", (0, 2)),
+        ("2 1", (2, 1)),
+        ("My move: 2,0", (2, 0)),
+        ("1,2,3", (1, 2)),
+        ("-1,0", (-1, 0)),
+        ("center", None),
+        ("1,", None),
+    ]
+
+    all_passed = True
+    for text, expected in test_cases:
+        result = parse_coord(text)
+        if result == expected:
+            print(f"  PASS {text!r} -> {result}")
+        else:
+            print(f"  FAIL {text!r} -> {result} (expected {expected})")
+            all_passed = False
+
+    return all_passed
+
+
+def test_canonical_board_symmetry():
+    """Test that all 8 symmetric boards share one canonical key."""
+    print("\n=== Test 7: Canonical Board Symmetry ===")
+
+    # X in a corner, O next to it
+    x_bits, o_bits = 1 << 0, 1 << 1
+    keys = set()
+    for perm in SYMS:
+        x = sum(((x_bits >> src) & 1) << k for k, src in enumerate(perm))
+        o = sum(((o_bits >> src) & 1) << k for k, src in enumerate(perm))
+        keys.add(canonicalize(x, o)[0])
+    all_passed = len(keys) == 1
+    print(f"  {'PASS' if all_passed else 'FAIL'} 8 symmetric boards -> {len(keys)} canonical key(s)")
+
+    # Mapping a cell into canonical space and back is the identity
+    round_trip = all(SYMS[s][INV_SYMS[s][cell]] == cell for s in range(8) for cell in range(9))
+    print(f"  {'PASS' if round_trip else 'FAIL'} canonical move round trip")
+
+    return all_passed and round_trip
+
+
+def test_solver_moves():
+    """Test that the solver finds wins and blocks and leaves open positions to the LLM."""
+    print("\n=== Test 8: Solver Moves ===")
+
+    test_cases = [
+        # (board, symbol, expected forced move)
+        ([['X', 'X', '.'], ['O', 'O', '.'], ['.', '.', '.']], 'O', (1, 2)),  # win beats block
+        ([['X', 'X', '.'], ['.', '.', '.'], ['.', '.', 'O']], 'O', (0, 2)),  # must block
+        ([['X', 'O', 'X'], ['X', 'O', 'O'], ['O', 'X', '.']], 'X', (2, 2)),  # last cell
+        ([['.', '.', '.'], ['.', '.', '.'], ['.', '.', '.']], 'X', None),  # every move draws
+    ]
+
+    all_passed = True
+    for board, symbol, expected in test_cases:
+        x_bits, o_bits = board_to_bits(board)
+        result = forced_move(x_bits, o_bits, symbol)
+        if result == expected:
+            print(f"  PASS {symbol} on {board} -> {result}")
+        else:
+            print(f"  FAIL {symbol} on {board} -> {result} (expected {expected})")
+            all_passed = False
+
+    # Perfect play from both sides always draws
+    x_bits = o_bits = 0
+    symbol = 'X'
+    while check_winner_bits(x_bits, o_bits) is None:
+        i, j = best_move(x_bits, o_bits, symbol)
+        if symbol == 'X':
+            x_bits |= 1 << (i * 3 + j)
+        else:
+            o_bits |= 1 << (i * 3 + j)
+        symbol = 'O' if symbol == 'X' else 'X'
+    result = check_winner_bits(x_bits, o_bits)
+    if result == 'DRAW':
+        print(f"  PASS self-play -> {result}")
+    else:
+        print(f"  FAIL self-play -> {result} (expected DRAW)")
+        all_passed = False
+
+    # The opening book covers plies 1-3 only
+    book_cases = [
+        ([['.', '.', '.'], ['.', '.', '.'], ['.', '.', '.']], 'O', (1, 1)),  # open in the center
+        ([['.', '.', '.'], ['.', 'X', '.'], ['.', '.', '.']], 'O', (0, 0)),  # answer center with a corner
+        ([['O', '.', '.'], ['.', 'X', '.'], ['.', '.', '.']], 'O', (0, 2)),  # ply 3
+        ([['O', '.', '.'], ['.', 'X', '.'], ['.', '.', 'O']], 'X', None),  # past the book
+    ]
+    for board, symbol, expected in book_cases:
+        result = book_move(*board_to_bits(board), symbol)
+        if result == expected:
+            print(f"  PASS book {symbol} on {board} -> {result}")
+        else:
+            print(f"  FAIL book {symbol} on {board} -> {result} (expected {expected})")
+            all_passed = False
+
+    return all_passed
+
+
+def test_strategy_moves():
+    """Test that the preflight only plays forced moves (win / block / last cell)."""
+    print("\n=== Test 9: Strategy Moves ===")
+
+    test_cases = [
+        # (board, symbol, expected move)
+        ([['X', 'X', '.'], ['O', 'O', '.'], ['.', '.', '.']], 'O', (1, 2)),  # win
+        ([['X', 'X', '.'], ['.', 'O', '.'], ['.', '.', '.']], 'O', (0, 2)),  # block
+        ([['X', 'O', 'X'], ['X', 'O', 'O'], ['O', 'X', '.']], 'X', (2, 2)),  # last cell
+        ([['.', '.', '.'], ['.', '.', '.'], ['.', '.', '.']], 'O', None),  # open board: left to the LLM
+        ([['X', '.', '.'], ['.', 'O', '.'], ['.', '.', 'X']], 'O', None),  # a corner here loses
+        ([['X', 'O', 'X'], ['O', 'O', 'X'], ['X', 'X', 'O']], 'O', None),  # full board
+    ]
+
+    all_passed = True
+    for board, symbol, expected in test_cases:
+        result = strategy_move(*board_to_bits(board), symbol)
+        if result == expected:
+            print(f"  PASS {symbol} on {board} -> {result}")
+        else:
+            print(f"  FAIL {symbol} on {board} -> {result} (expected {expected})")
+            all_passed = False
+
+    return all_passed
+
+
+def test_astream_move_stops_early():
+    """Test that streaming stops reading soon after the reply contains a coordinate."""
+    import asyncio
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    print("\n=== Test 10: Streamed Move Parsing ===")
+
+    test_cases = [
+        # (full reply, expected move, whether the stream is cut off)
+        ("1,2 because" + " it blocks the row" * 10, (1, 2), True),
+        ("I will play 0,0 now", (0, 0), False),
+        ("no idea", None, False),
+    ]
+
+    all_passed = True
+    for reply, expected, cut in test_cases:
+        model = GenericFakeChatModel(messages=iter([AIMessage(content=reply)]))
+        result = asyncio.run(astream_move(model, "move")).content
+        if parse_coord(result) == expected and (len(result) < len(reply)) == cut:
+            print(f"  PASS {reply[:30]!r} -> {result[:30]!r}")
+        else:
+            print(f"  FAIL {reply[:30]!r} -> {result!r} (expected {expected}, cut off: {cut})")
+            all_passed = False
+
+    class StreamingAgent:
+        """Streams one chunk per piece; like Ollama, only the last chunk carries usage."""
+        def __init__(self, pieces):
+            self.pieces = pieces
+            self.sent = 0
+
+        async def astream(self, prompt):
+            for k, piece in enumerate(self.pieces):
+                self.sent += 1
+                usage = ({'input_tokens': 40, 'output_tokens': 3, 'total_tokens': 43}
+                         if k == len(self.pieces) - 1 else None)
+                yield AIMessageChunk(content=piece, usage_metadata=usage)
+
+    usage_cases = [
+        # (streamed pieces, expected tokens, expected chunks read)
+        (["1", ",", "2", ""], 43, 4),  # usage chunk right after the move is kept
+        (["1,2"] + [" more"] * 20 + [""], None, 1 + USAGE_GRACE_CHUNKS),  # cut off: reported as unknown
+    ]
+    for pieces, expected_tokens, expected_sent in usage_cases:
+        agent = StreamingAgent(pieces)
+        response = asyncio.run(astream_move(agent, "move"))
+        tokens = reported_tokens(response)
+        if (parse_coord(response.content) == (1, 2) and tokens == expected_tokens and agent.sent == expected_sent
+                and get_token_used(response) == (tokens or 0)):
+            print(f"  PASS {len(pieces)} chunks -> tokens {tokens}, read {agent.sent}")
+        else:
+            print(f"  FAIL {len(pieces)} chunks -> tokens {tokens}, read {agent.sent} "
+                  f"(expected {expected_tokens}, {expected_sent})")
+            all_passed = False
+
+    return all_passed
+
+
+def test_speculation_cancels_orphaned_batch():
+    """Test that orphaned speculative batches are cancelled and discarded calls are tallied."""
+    import asyncio
+    from tic_tac_toe.llm_moves import Speculation
+    print("\n=== Test 11: Speculation Cleanup ===")
+
+    async def scenario():
+        speculation = Speculation(limit=2)
+        cancelled = []
+
+        async def slow_batch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        speculation.start_batch([('O', 1), ('O', 2)], slow_batch)
+        await asyncio.sleep(0)
+        speculation.cancel(keep=('O', 2))  # One item still waits: the batch keeps running
+        await asyncio.sleep(0.01)
+        kept_running = not cancelled
+        speculation.cancel()  # Last item gone: the batch must stop
+        await asyncio.sleep(0.01)
+        stopped = bool(cancelled)
+        speculation.start(('X', 3), slow_batch)
+
+        async def quick_reply():
+            return (0, 0), 10
+
+        speculation.start(('X', 4), quick_reply)
+        await asyncio.sleep(0.01)
+        await speculation.stop()  # Cuts off ('X', 3) and throws away the finished ('X', 4)
+        return kept_running, stopped, len(cancelled), speculation.limit._value, speculation.waste_report()
+
+    kept_running, stopped, cancelled, free_slots, waste = asyncio.run(scenario())
+    expected_waste = "10, plus 3 calls cancelled mid-flight"  # Two batched requests and one single call
+    if kept_running and stopped and cancelled == 2 and free_slots == 2 and waste == expected_waste:
+        print("  PASS batch outlives a cancelled branch, stops with the last one, stop() frees every slot, "
+              "and discarded calls are tallied")
+        return True
+    print(f"  FAIL kept running: {kept_running}, stopped: {stopped}, cancelled: {cancelled}, "
+          f"free slots: {free_slots}, waste: {waste!r}")
+    return False
+
+
+def test_move_cache_file():
+    """Test that the move cache persists to its own file and refuses a second concurrent user."""
+    import tempfile
+    from tic_tac_toe.move_cache import MoveCache, CacheInUseError
+    print("\n=== Test 12: Move Cache File ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'nested' / 'move_cache.db'
+        first = MoveCache(path)
+        first.open()
+        first.put('model', 0o001, 0o000, (1, 1))
+        try:
+            MoveCache(path).open()
+            refused = False
+        except CacheInUseError:
+            refused = True
+        first.close()
+
+        second = MoveCache(path)  # Fresh memory: the answer has to come from disk
+        second.open()
+        # The same position mirrored left/right shares the cached answer
+        found = second.get('model', 0o001, 0o000), second.get('model', 0o004, 0o000)
+        second.close()
+
+    if refused and found == ((1, 1), (1, 1)):
+        print("  PASS second open refused while in use; moves survive a reopen, symmetry included")
+        return True
+    print(f"  FAIL refused: {refused}, found: {found}")
+    return False
+
+
 def main():
     """Run all tests."""
     print("=" * 50)
@@ -146,6 +445,14 @@ def main():
         "Score Update Conversion": test_score_update_conversion(),
         "Complete Game Flow": test_board_state_flow(),
         "Counter Reset on Valid Move": test_invalid_move_reset(),
+        "Bitboard Logic": test_bitboard_matches_board_logic(),
+        "Coordinate Parsing": test_parse_coord(),
+        "Canonical Symmetry": test_canonical_board_symmetry(),
+        "Solver Moves": test_solver_moves(),
+        "Strategy Moves": test_strategy_moves(),
+        "Streamed Move Parsing": test_astream_move_stops_early(),
+        "Speculation Cleanup": test_speculation_cancels_orphaned_batch(),
+        "Move Cache File": test_move_cache_file(),
     }
 
     print("\n" + "=" * 50)